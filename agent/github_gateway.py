@@ -0,0 +1,158 @@
+# Kept in sync with server/app/services/GitHubGateway.py: these scripts run standalone, without the server package
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from github import Auth, Github
+from github.Repository import Repository
+from github.Requester import HTTPSRequestsConnectionClass, RequestsResponse
+from urllib3.util import Retry
+
+from github_http_cache import ConditionalCacheAdapter, github_http_cache
+from github_rate_limiter import RateLimitedAdapter, github_rate_limiter, token_key
+
+
+class _GatewayAdapter(ConditionalCacheAdapter, RateLimitedAdapter):
+    # Cache first: fresh hits never reach the rate limiter, everything else is scheduled
+    pass
+
+
+class _GatewayConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub's persistent HTTPS connection with the cache and rate limiter as its transport.
+
+    PyGithub keeps one connection per client and calls `request()` then
+    `getresponse()` on it, storing the request on the instance in between. The
+    gateway shares a client between threads, so that state is kept per thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.adapter = _GatewayAdapter(
+            cache=github_http_cache,
+            limiter=github_rate_limiter,
+            max_retries=self.retry,
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+        )
+        self.session.mount("https://", self.adapter)
+        self._pending = threading.local()
+
+    def request(self, verb: str, url: str, input, headers: Dict[str, str], stream: bool = False) -> None:
+        self._pending.request = (verb, url, input, headers)
+
+    def getresponse(self) -> RequestsResponse:
+        verb, url, input, headers = self._pending.request
+        del self._pending.request
+        response = self.session.request(
+            verb,
+            f"{self.protocol}://{self.host}:{self.port}{url}",
+            headers=headers,
+            data=input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+        return RequestsResponse(response)
+
+
+class GitHubGateway:
+    """
+    Shared entry point to the GitHub API for every tool.
+
+    Keeps one `Github` client per token, so each token reuses a persistent HTTP
+    session (keep-alive, a connection pool of `pool_size` connections) instead of
+    a new TLS handshake per tool call, and memoizes the `Repository` object per
+    (token, repository) for `repo_ttl_seconds`, which saves the repository
+    metadata request every tool used to start with. Clients are kept in an LRU of
+    at most `max_clients` tokens. Their GET requests go through `github_http_cache`,
+    so rereading an unchanged file, tree or issue list is a 304 revalidation, and
+    every request is paced and retried per token by `github_rate_limiter`.
+    """
+
+    def __init__(self, max_clients: int = 32, pool_size: int = 10, timeout_seconds: int = 15, repo_ttl_seconds: float = 300.0):
+        self.max_clients = max(1, max_clients)
+        self.pool_size = max(1, pool_size)
+        self.timeout_seconds = timeout_seconds
+        self.repo_ttl_seconds = repo_ttl_seconds
+        self._clients: "OrderedDict[str, Github]" = OrderedDict()
+        self._repos: Dict[Tuple[str, str], Tuple[Repository, float]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"client_hits": 0, "client_creations": 0, "client_evictions": 0, "repo_hits": 0, "repo_fetches": 0}
+
+    def client(self, token: str) -> Github:
+        """The pooled client for `token`, created on first use."""
+        key = token_key(token)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self._counters["client_hits"] += 1
+                return client
+            # Status retries belong to the rate limiter; urllib3 only retries connection errors
+            retry = Retry(total=3, backoff_factor=0.5, respect_retry_after_header=False)
+            client = Github(auth=Auth.Token(token), pool_size=self.pool_size, timeout=self.timeout_seconds, retry=retry)
+            # Per client rather than Requester.injectConnectionClasses, which turns off connection reuse.
+            # A private PyGithub attribute: server/requirements.txt pins PyGithub, its tests check it still works
+            client.requester._Requester__connectionClass = _GatewayConnection
+            self._clients[key] = client
+            self._counters["client_creations"] += 1
+            while len(self._clients) > self.max_clients:
+                self._evict_lru()
+            return client
+
+    def repo(self, token: str, repository: str) -> Repository:
+        """
+        The `Repository` for `repository` as seen by `token`, fetched at most once per TTL.
+        A token from the shared pool is swapped for the pooled token with the most budget left.
+        """
+        token = github_rate_limiter.pick(token)
+        key = (token_key(token), repository)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._repos.get(key)
+            if cached is not None and now - cached[1] < self.repo_ttl_seconds:
+                self._counters["repo_hits"] += 1
+                return cached[0]
+
+        repo = self.client(token).get_repo(repository)
+        with self._lock:
+            self._repos[key] = (repo, now)
+            self._counters["repo_fetches"] += 1
+        return repo
+
+    def invalidate(self, token: str, repository: str) -> None:
+        """Forgets the memoized repository, e.g. after its default branch changed."""
+        with self._lock:
+            self._repos.pop((token_key(token), repository), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "clients": len(self._clients),
+                "repositories": len(self._repos),
+                "max_clients": self.max_clients,
+                "pool_size": self.pool_size,
+                "timeout_seconds": self.timeout_seconds,
+                "repo_ttl_seconds": self.repo_ttl_seconds,
+                "http_cache": github_http_cache.stats(),
+            }
+
+    def _evict_lru(self) -> None:
+        # Caller must hold self._lock
+        # Not closed explicitly: a tool call may still be using it, its session closes once unreferenced
+        key, _ = self._clients.popitem(last=False)
+        for repo_key in [repo_key for repo_key in self._repos if repo_key[0] == key]:
+            del self._repos[repo_key]
+        self._counters["client_evictions"] += 1
+
+
+github_gateway = GitHubGateway(
+    max_clients=int(os.getenv("CODEMEDIC_GITHUB_MAX_CLIENTS", "32")),
+    pool_size=int(os.getenv("CODEMEDIC_GITHUB_POOL_SIZE", "10")),
+    timeout_seconds=int(os.getenv("CODEMEDIC_GITHUB_TIMEOUT_SECONDS", "15")),
+    repo_ttl_seconds=float(os.getenv("CODEMEDIC_GITHUB_REPO_TTL_SECONDS", "300")),
+)
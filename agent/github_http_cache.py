@@ -0,0 +1,162 @@
+# Kept in sync with server/app/services/GitHubHttpCache.py: these scripts run standalone, without the server package
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Headers of a 304 that describe its (empty) body, not the cached one
+_BODY_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "content-type"}
+
+
+class _CachedResponse:
+    def __init__(self, body: bytes, headers: CaseInsensitiveDict, encoding: Optional[str], stored_at: float):
+        self.body = body
+        self.headers = headers
+        self.encoding = encoding
+        self.stored_at = stored_at
+
+
+class GitHubHttpCache:
+    """
+    Bodies of GitHub GET responses with their validators (ETag, Last-Modified).
+
+    Entries are keyed by URL, token and Accept header, since GitHub varies both the
+    body and the ETag on them. Every read is revalidated: a 304 answer costs no
+    rate-limit quota and carries no body, the cached body is served instead. With
+    `max_age_seconds` > 0 an entry younger than that is served without asking
+    GitHub at all. Entries are kept in an LRU of at most `max_bytes` of bodies.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_age_seconds: float = 0.0):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], _CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "revalidated": 0, "misses": 0, "uncacheable": 0}
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> Tuple[str, str, str]:
+        # The key never holds the token itself
+        authorization = request.headers.get("Authorization", "")
+        return (
+            request.url,
+            hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:16],
+            request.headers.get("Accept", ""),
+        )
+
+    def get(self, key) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: _CachedResponse) -> bool:
+        return self.max_age_seconds > 0 and time.monotonic() - entry.stored_at < self.max_age_seconds
+
+    def put(self, key, response: requests.Response) -> None:
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        entry = _CachedResponse(body, CaseInsensitiveDict(response.headers), response.encoding, time.monotonic())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["revalidated"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round((self._counters["hits"] + self._counters["revalidated"]) / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+            }
+
+
+class ConditionalCacheAdapter(HTTPAdapter):
+    """
+    Transport adapter that answers GitHub GETs from `cache`, revalidating them with
+    `If-None-Match` / `If-Modified-Since`. A 304 is turned back into the 200 the
+    caller expects, with the cached body and the 304's fresh headers (rate limit).
+    Requests that already carry a validator, and streamed downloads, pass through.
+    """
+
+    def __init__(self, cache: GitHubHttpCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, **kwargs) -> requests.Response:
+        if (
+            request.method != "GET"
+            or stream
+            or "If-None-Match" in request.headers
+            or "If-Modified-Since" in request.headers
+        ):
+            return super().send(request, stream=stream, **kwargs)
+
+        key = self.cache.key(request)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.count("hits")
+            return self._from_cache(request, entry, entry.headers)
+
+        if entry is not None:
+            request = request.copy()
+            if "ETag" in entry.headers:
+                request.headers["If-None-Match"] = entry.headers["ETag"]
+            if "Last-Modified" in entry.headers:
+                request.headers["If-Modified-Since"] = entry.headers["Last-Modified"]
+
+        response = super().send(request, stream=stream, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.count("revalidated")
+            response.close()
+            entry.stored_at = time.monotonic()
+            headers = CaseInsensitiveDict(entry.headers)
+            headers.update({name: value for name, value in response.headers.items() if name.lower() not in _BODY_HEADERS})
+            return self._from_cache(request, entry, headers)
+
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self.cache.count("misses")
+            self.cache.put(key, response)
+        else:
+            self.cache.count("uncacheable")
+        return response
+
+    @staticmethod
+    def _from_cache(request: requests.PreparedRequest, entry: _CachedResponse, headers: CaseInsensitiveDict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response._content = entry.body
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = entry.encoding
+        response.url = request.url
+        response.request = request
+        return response
+
+
+github_http_cache = GitHubHttpCache(
+    max_bytes=int(float(os.getenv("CODEMEDIC_GITHUB_HTTP_CACHE_MB", "64")) * 1024 * 1024),
+    max_age_seconds=float(os.getenv("CODEMEDIC_GITHUB_HTTP_CACHE_MAX_AGE_SECONDS", "0")),
+)
@@ -0,0 +1,256 @@
+# Kept in sync with server/app/services/GitHubRateLimiter.py: these scripts run standalone, without the server package
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Requests are retried on these even when they are not idempotent: GitHub did not process them
+_RATE_LIMIT_STATUSES = {403, 429}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+def token_key(token: str) -> str:
+    # Budgets and pools are keyed by a hash, never by the token itself
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def _resource(request: requests.PreparedRequest) -> str:
+    # GitHub keeps a separate budget per resource, the rest of the REST API shares "core"
+    path = request.path_url
+    if path.startswith("/search/"):
+        return "search"
+    if path.startswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class _Budget:
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: float = 0.0
+        self.blocked_until: float = 0.0
+        self.next_slot: float = 0.0
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "server_errors": 0, "paced": 0, "paced_seconds": 0.0}
+
+
+class GitHubRateLimiter:
+    """
+    Per-token scheduler for GitHub requests.
+
+    Every response updates the token's budget from `X-RateLimit-Limit/Remaining/Reset`
+    (per resource: core, search, graphql). Once less than `reserve_fraction` of the
+    budget is left, requests on that token are queued and paced evenly over the time
+    until the reset, so the budget lasts instead of running dry mid-run. Secondary
+    limits (`Retry-After`, or a 403/429 mentioning a rate limit) block the token for
+    every caller until they lift. Rate-limited requests, and 5xx on idempotent
+    requests, are retried up to `max_retries` times with jittered exponential
+    backoff; waits longer than `max_wait_seconds` are not taken, the error goes back
+    to the caller instead.
+
+    Tokens listed in `pool` are interchangeable: `pick` hands out the one with the
+    most budget left whenever a caller uses any of them.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[List[str]] = None,
+        reserve_fraction: float = 0.1,
+        max_retries: int = 3,
+        base_backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0,
+        secondary_wait_seconds: float = 60.0,
+        max_wait_seconds: float = 120.0,
+    ):
+        self.pool = {token_key(token): token for token in pool or [] if token}
+        self.reserve_fraction = reserve_fraction
+        self.max_retries = max(0, max_retries)
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.secondary_wait_seconds = secondary_wait_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._budgets: Dict[Tuple[str, str], _Budget] = {}
+        self._lock = threading.Lock()
+
+    def pick(self, token: str) -> str:
+        """`token`, or the pooled token with the most core budget left if `token` is pooled."""
+        key = token_key(token)
+        if key not in self.pool:
+            return token
+        now = time.time()
+        with self._lock:
+            # The caller's own token comes first, so it wins ties
+            candidates = [key] + [pool_key for pool_key in self.pool if pool_key != key]
+            best = max(candidates, key=lambda candidate: self._headroom(candidate, now))
+        return self.pool[best]
+
+    def acquire(self, key: str, resource: str) -> None:
+        """Waits until the token may send the next request on `resource`."""
+        now = time.time()
+        with self._lock:
+            budget = self._budget(key, resource)
+            budget.counters["requests"] += 1
+            wait = 0.0
+            if budget.blocked_until > now:
+                wait = budget.blocked_until - now
+            elif budget.remaining is not None and budget.reset > now:
+                if budget.remaining <= 0:
+                    wait = budget.reset - now + 1
+                elif budget.limit and budget.remaining <= budget.limit * self.reserve_fraction:
+                    # Spread what is left evenly until the reset
+                    start = max(now, budget.next_slot)
+                    budget.next_slot = start + (budget.reset - now) / budget.remaining
+                    wait = start - now
+                # Reserved now, corrected by the response headers
+                budget.remaining = max(0, budget.remaining - 1)
+            if wait > self.max_wait_seconds:
+                # Not worth blocking a tool call this long: GitHub's error goes back to the caller
+                wait = 0.0
+            if wait > 0:
+                budget.counters["paced"] += 1
+                budget.counters["paced_seconds"] += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, key: str, resource: str, response: requests.Response) -> None:
+        """Updates the token's budget from the rate-limit headers of `response`."""
+        headers = response.headers
+        now = time.time()
+        with self._lock:
+            budget = self._budget(key, resource)
+            try:
+                if "X-RateLimit-Limit" in headers:
+                    budget.limit = int(headers["X-RateLimit-Limit"])
+                if "X-RateLimit-Remaining" in headers:
+                    budget.remaining = int(headers["X-RateLimit-Remaining"])
+                if "X-RateLimit-Reset" in headers:
+                    budget.reset = float(headers["X-RateLimit-Reset"])
+            except ValueError:
+                pass
+            if self._is_rate_limited(response):
+                budget.counters["rate_limited"] += 1
+                retry_after = self._retry_after(response)
+                if retry_after is not None:
+                    budget.blocked_until = max(budget.blocked_until, now + retry_after)
+                elif budget.remaining != 0:
+                    # Secondary limit without Retry-After: GitHub asks for at least a minute
+                    budget.blocked_until = max(budget.blocked_until, now + self.secondary_wait_seconds)
+            elif response.status_code >= 500:
+                budget.counters["server_errors"] += 1
+
+    def retry_delay(self, key: str, resource: str, request: requests.PreparedRequest, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying `request`, None if it should not be retried."""
+        if attempt >= self.max_retries:
+            return None
+        if self._is_rate_limited(response):
+            retry_after = self._retry_after(response)
+            if retry_after is None and response.headers.get("X-RateLimit-Remaining") == "0":
+                retry_after = float(response.headers.get("X-RateLimit-Reset", 0)) - time.time() + 1
+            elif retry_after is None:
+                retry_after = self.secondary_wait_seconds
+            if retry_after > self.max_wait_seconds:
+                return None
+            # acquire() holds the retry until the limit lifts; the jitter keeps the callers
+            # blocked on the same token from all coming back at once
+            delay = random.uniform(0, self.base_backoff_seconds)
+        elif response.status_code >= 500 and request.method in _IDEMPOTENT_METHODS:
+            # Full jitter exponential backoff
+            delay = random.uniform(0, min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** attempt))
+        else:
+            return None
+        with self._lock:
+            self._budget(key, resource).counters["retries"] += 1
+        return delay
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            tokens: Dict[str, dict] = {}
+            for (key, resource), budget in self._budgets.items():
+                tokens.setdefault(key, {"pooled": key in self.pool, "resources": {}})["resources"][resource] = {
+                    "limit": budget.limit,
+                    "remaining": budget.remaining if budget.reset > now else budget.limit,
+                    "reset_in_seconds": round(max(0.0, budget.reset - now), 1),
+                    "blocked_for_seconds": round(max(0.0, budget.blocked_until - now), 1),
+                    **{name: round(value, 2) for name, value in budget.counters.items()},
+                }
+            return {
+                "tokens": tokens,
+                "pool_size": len(self.pool),
+                "reserve_fraction": self.reserve_fraction,
+                "max_retries": self.max_retries,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def _budget(self, key: str, resource: str) -> _Budget:
+        # Caller must hold self._lock
+        budget = self._budgets.get((key, resource))
+        if budget is None:
+            budget = self._budgets[(key, resource)] = _Budget()
+        return budget
+
+    def _headroom(self, key: str, now: float) -> float:
+        # Caller must hold self._lock
+        budget = self._budgets.get((key, "core"))
+        if budget is None or budget.remaining is None or budget.reset <= now:
+            # Unused, or reset since last seen: a full budget
+            return float("inf")
+        if budget.blocked_until > now:
+            return -1.0
+        return budget.remaining
+
+    @staticmethod
+    def _is_rate_limited(response: requests.Response) -> bool:
+        if response.status_code not in _RATE_LIMIT_STATUSES:
+            return False
+        if response.status_code == 429 or "Retry-After" in response.headers or response.headers.get("X-RateLimit-Remaining") == "0":
+            return True
+        # A plain 403 is a permission error; rate-limit 403s say so in the message
+        return "rate limit" in response.text.lower()
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Transport adapter that sends every request through `limiter`: pacing, budget tracking and retries."""
+
+    def __init__(self, limiter: GitHubRateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        authorization = request.headers.get("Authorization", "")
+        # "token <token>" or "Bearer <token>": keyed like the gateway keys the raw token
+        key = token_key(authorization.split(" ", 1)[-1])
+        resource = _resource(request)
+        attempt = 0
+        while True:
+            self.limiter.acquire(key, resource)
+            response = super().send(request, **kwargs)
+            self.limiter.record(key, resource, response)
+            delay = self.limiter.retry_delay(key, resource, request, response, attempt)
+            if delay is None:
+                return response
+            print(f"🔁 GitHub answered {response.status_code} to {request.method} {request.path_url}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+github_rate_limiter = GitHubRateLimiter(
+    pool=[token.strip() for token in os.getenv("CODEMEDIC_GITHUB_TOKEN_POOL", "").split(",")],
+    reserve_fraction=float(os.getenv("CODEMEDIC_GITHUB_RESERVE_FRACTION", "0.1")),
+    max_retries=int(os.getenv("CODEMEDIC_GITHUB_MAX_RETRIES", "3")),
+    base_backoff_seconds=float(os.getenv("CODEMEDIC_GITHUB_BACKOFF_SECONDS", "1")),
+    max_wait_seconds=float(os.getenv("CODEMEDIC_GITHUB_MAX_WAIT_SECONDS", "120")),
+)
@@ -45,3 +45,8 @@ class CreatePullRequestInput(BaseModel):
     pull_request_data: PullRequest
     github_credentials: GitHubCredentials
 
+class RepositoryTreeEntry(BaseModel):
+    path: str
+    type: str  # "blob" (file) or "tree" (directory)
+    sha: str
+    size: Optional[int] = None
@@ -11,8 +11,8 @@ import asyncio
 from dotenv import load_dotenv
 import os
 from langchain_huggingface import HuggingFacePipeline
-from github import Github
 from github.GithubException import GithubException
+from github_gateway import github_gateway
 
 # Define the plan and executor structure
 
@@ -83,8 +83,7 @@ class PlanExecuteAgent:
             Returns the list of file names from the root of the given GitHub repository.
             """
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 contents = repo.get_contents("")
                 files_list = []
                 while contents:
@@ -103,8 +102,7 @@ class PlanExecuteAgent:
             Retrieves the content of a specific file from the GitHub repository.
             """
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 content = repo.get_contents(file_name)
                 return f"📄 The file `{file_name}` contains:\n\n```python\n{content.decoded_content.decode()}\n```"
             except Exception as e:
@@ -116,8 +114,7 @@ class PlanExecuteAgent:
             Creates a new branch from the specified base branch.
             """
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 base_ref = repo.get_git_ref(f"heads/{base_branch}")
                 base_sha = base_ref.object.sha
                 new_ref = f"refs/heads/{new_branch}"
@@ -143,8 +140,7 @@ class PlanExecuteAgent:
             Updates a file in the specified GitHub branch.
             """
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 contents = repo.get_contents(file_path, ref=branch)
                 current_sha = contents.sha
 
@@ -172,8 +168,7 @@ class PlanExecuteAgent:
             Creates a pull request with the given data.
             """
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 pull_request = repo.create_pull(
                     title=title,
                     body=body,
@@ -11,8 +11,8 @@ import asyncio
 from dotenv import load_dotenv
 import os
 from langchain_huggingface import HuggingFacePipeline
-from github import Github
 from github.GithubException import GithubException
+from github_gateway import github_gateway
 
 
 class FinalAgentOutput(BaseModel):
@@ -50,8 +50,7 @@ class ReactAgent:
             """
             print("Inside get_repository_file_names")
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 contents = repo.get_contents("")
                 files_list = []
                 while contents:
@@ -71,8 +70,7 @@ class ReactAgent:
             """
             print("Inside get_repository_file_content")
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 content = repo.get_contents(file_name)
                 return f"📄 The file `{file_name}` contains:\n\n```python\n{content.decoded_content.decode()}\n```"
             except Exception as e:
@@ -85,8 +83,7 @@ class ReactAgent:
             """
             print("Inside create_branch")
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 base_ref = repo.get_git_ref(f"heads/{base_branch}")
                 base_sha = base_ref.object.sha
                 new_ref = f"refs/heads/{new_branch}"
@@ -113,8 +110,7 @@ class ReactAgent:
             """
             print("Inside update_file_in_branch")
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 contents = repo.get_contents(file_path, ref=branch)
                 current_sha = contents.sha
 
@@ -143,8 +139,7 @@ class ReactAgent:
             """
             print("Inside create_pull_request")
             try:
-                github_client = Github(github_token)
-                repo = github_client.get_repo(repository)
+                repo = github_gateway.repo(github_token, repository)
                 pull_request = repo.create_pull(
                     title=title,
                     body=body,
@@ -1,17 +1,17 @@
-from typing import List, Any
+from typing import List, Any, Optional
 
-from github import Github
 from github.GithubException import GithubException
+from github.Repository import Repository
 
-from models.models import GitHubCredentials, GitHubIssue
+from github_gateway import github_gateway
+from models.models import GitHubCredentials, GitHubIssue, RepositoryTreeEntry
 
 
 def get_github_issues(github_credentials:GitHubCredentials) -> List[GitHubIssue]:
     """Obtiene los issues abiertos del repositorio."""
     try:
         print(f"\n🔍 Intentando acceder al repositorio: {github_credentials.repository_name}")
-        github_client = Github(github_credentials.token)
-        repo = github_client.get_repo(github_credentials.repository_name)
+        repo = github_gateway.repo(github_credentials.token, github_credentials.repository_name)
         print("✓ Repositorio encontrado")
 
         print("\n📋 Obteniendo issues abiertos...")
@@ -60,25 +60,53 @@ def get_repository_file_names(github_token: str, repository: str) -> List[str]:
     """
     try:
         print(f"\n🔍 Trying to access github repository: {repository}")
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         print("✓ Github repository founded")
     except Exception as e:
         print(f"❌ Error when obtaining issues: {str(e)}")
         return []
 
-    contents = repo.get_contents("")
     files_list = []
-    while contents:
-        file_content = contents.pop(0)
-        if file_content.type == "dir":
-            contents.extend(repo.get_contents(file_content.path))
-        else:
-            files_list.append(file_content.name)
-            print("File name: ", file_content.name)
+    for entry in get_repository_tree(repo):
+        if entry.type == "blob":
+            file_name = entry.path.rsplit("/", 1)[-1]
+            files_list.append(file_name)
+            print("File name: ", file_name)
     return files_list
 
 
+def get_repository_tree(repo: Repository, ref: Optional[str] = None) -> List[RepositoryTreeEntry]:
+    """
+    Lists every file and directory (with blob SHAs and sizes) at the head of `ref`
+    using a single recursive Git Trees API call. Falls back to walking the tree
+    one directory at a time only when GitHub truncates the recursive response.
+    """
+    branch = ref or repo.default_branch
+    head_sha = repo.get_git_ref(f"heads/{branch}").object.sha
+    git_tree = repo.get_git_tree(head_sha, recursive=True)
+
+    if not git_tree.raw_data.get("truncated"):
+        return [
+            RepositoryTreeEntry(path=element.path, type=element.type, sha=element.sha, size=element.size)
+            for element in git_tree.tree
+            if element.type in ("blob", "tree")
+        ]
+
+    print("⚠️ Recursive tree is truncated, walking it per directory")
+    entries = []
+    pending = [("", git_tree.sha)]
+    while pending:
+        prefix, tree_sha = pending.pop(0)
+        for element in repo.get_git_tree(tree_sha).tree:
+            if element.type not in ("blob", "tree"):
+                continue
+            entry = RepositoryTreeEntry(path=f"{prefix}{element.path}", type=element.type, sha=element.sha, size=element.size)
+            entries.append(entry)
+            if entry.type == "tree":
+                pending.append((f"{entry.path}/", entry.sha))
+    return entries
+
+
 
 def get_repository_file_content(github_token: str, repository: str, file_name: str) -> str:
     """
@@ -86,8 +114,7 @@ def get_repository_file_content(github_token: str, repository: str, file_name: s
     """
     try:
         print(f"\n🔍 Trying to access github repository: {repository}")
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         print("✓ Github repository founded")
     except Exception as e:
         return f"❌ Error when obtaining issues: {str(e)}"
@@ -135,8 +162,7 @@ def create_branch(
     try:
         print(f"🌿 Creating branch '{new_branch}' from '{base_branch}' in repo '{repository}'")
 
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
 
         # Get the commit SHA of the base branch
         base_ref = repo.get_git_ref(f"heads/{base_branch}")
@@ -183,8 +209,7 @@ def update_file_in_branch(
         Status message indicating success or error.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
 
         # Get the current file SHA (required to update the file)
         contents = repo.get_contents(file_path, ref=branch)
@@ -224,8 +249,7 @@ def create_pull_request(
         print(base_branch)
 
 
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         pull_request = repo.create_pull(
             title=title,
             body=body,
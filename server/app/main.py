@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from app.routers.AgentRoutes import router
+from app.routers.JobRoutes import router as job_router
+from app.routers.MetricsRoutes import router as metrics_router
+from app.services.AgentExecutor import agent_executor
+from app.services.ModelRegistry import preload_models_from_env
 
 app = FastAPI(title="CodeMedic API")
 
@@ -14,6 +18,21 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix="/api")
+app.include_router(job_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
+
+@app.on_event("startup")
+def preload_models():
+    # Optional: warm the fix model(s) before the first request (CODEMEDIC_PRELOAD_MODELS)
+    preload_models_from_env()
+
+@app.on_event("shutdown")
+def stop_agent_workers():
+    agent_executor.shutdown()
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "agents": agent_executor.stats()}
 
 @app.get("/")
 async def root():
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 class FileEditInput(BaseModel):
@@ -7,6 +7,12 @@ class FileEditInput(BaseModel):
     content: str
 
 
+# "react": the LLM plans every step; "pipeline": code drives the fixed fix-and-PR workflow
+AgentMode = Literal["react", "pipeline"]
+
+# "full": the fix model rewrites the whole code; "diff": it returns a unified diff
+FixOutputFormat = Literal["full", "diff"]
+
 class GitHubIssue(BaseModel):
     number: int
     title: str
@@ -23,5 +29,96 @@ class FinalAgentOutput(BaseModel):
     messages: List[str]
     summary: str
     tool_path: List[str]
+    mode: Optional[str] = None
+    llm_calls: Optional[int] = None
+    latency_seconds: Optional[float] = None
+
+class AgentJobProgress(BaseModel):
+    step: int = 0
+    current_tool: Optional[str] = None
+    tool_path: List[str] = []
+
+class AgentJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    repository: str
+    issue_number: int
+    mode: AgentMode = "react"
+    fix_model: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    progress: AgentJobProgress = AgentJobProgress()
+    cancel_requested: bool = False
+    result: Optional[FinalAgentOutput] = None
+    error: Optional[str] = None
+
 class FixedCodeIssue(BaseModel):
-    fixed_code: str
\ No newline at end of file
+    fixed_code: str
+
+class CachedFix(BaseModel):
+    original_code: str
+    fixed_code: str
+    created_at: datetime
+
+class RepositoryTreeEntry(BaseModel):
+    path: str
+    type: str  # "blob" (file) or "tree" (directory)
+    sha: str
+    size: Optional[int] = None
+    mode: Optional[str] = None  # git file mode, e.g. "100644" or "100755" (executable)
+
+class RepositoryTree(BaseModel):
+    repository: str
+    commit_sha: str
+    entries: List[RepositoryTreeEntry]
+
+    def file_paths(self) -> List[str]:
+        return [entry.path for entry in self.entries if entry.type == "blob"]
+
+    def dir_paths(self) -> List[str]:
+        return [entry.path for entry in self.entries if entry.type == "tree"]
+
+class LocalizedFile(BaseModel):
+    path: str
+    score: float
+    line: Optional[int] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    reasons: List[str] = []
+
+class CodeRegion(BaseModel):
+    kind: Literal["function", "class", "window"]
+    name: Optional[str] = None
+    start_line: int
+    end_line: int
+    indent: str = ""
+
+class SymbolDefinition(BaseModel):
+    qualname: str
+    kind: Literal["function", "class"]
+    start_line: int
+    end_line: int
+
+class SymbolImport(BaseModel):
+    module: str
+    names: List[str] = []
+    line: int
+
+class SymbolCall(BaseModel):
+    name: str
+    line: int
+    caller: Optional[str] = None  # qualname of the enclosing definition
+
+class FileSymbols(BaseModel):
+    path: str
+    blob_sha: str
+    module: str
+    definitions: List[SymbolDefinition] = []
+    imports: List[SymbolImport] = []
+    calls: List[SymbolCall] = []
+    parse_error: Optional[str] = None
+
+class SymbolIndexData(BaseModel):
+    repository: str
+    commit_sha: str
+    files: Dict[str, FileSymbols] = {}
@@ -1,7 +1,14 @@
+import json
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.models.models import GitHubIssue, GitHubCredentials
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from pydantic import BaseModel, field_validator
+from app.models.models import AgentMode, GitHubIssue, GitHubCredentials
 from app.services.AgentService import AgentService
+from app.services.AgentExecutor import agent_executor
+from app.services.ModelRegistry import ALLOWED_FIX_MODEL_IDS
 
 
 router = APIRouter(prefix="/fix", tags=["fix"])
@@ -9,14 +16,66 @@ router = APIRouter(prefix="/fix", tags=["fix"])
 class FixCodeRequest(BaseModel):
     github_credentials: GitHubCredentials
     issue_data: GitHubIssue
+    mode: AgentMode = "react"
+    # Fix model (adapter id) for every fix in the run; by default the model router picks one per snippet
+    fix_model: Optional[str] = None
+
+    @field_validator("fix_model")
+    @classmethod
+    def _check_fix_model(cls, fix_model: Optional[str]) -> Optional[str]:
+        if fix_model is not None and fix_model not in ALLOWED_FIX_MODEL_IDS:
+            raise ValueError(f"Unknown fix model, expected one of {ALLOWED_FIX_MODEL_IDS}")
+        return fix_model
 
 @router.post(path="/issue/structured")
 async def fix_code_structured(fix_code_request: FixCodeRequest):
     """New endpoint using StructuredAgent with JsonOutputParser"""
     try:
-        agent_service: AgentService = AgentService(fix_code_request.github_credentials, fix_code_request.issue_data)
-        agent_response=agent_service.fix_issue_structured()
+        agent_service: AgentService = AgentService(
+            fix_code_request.github_credentials,
+            fix_code_request.issue_data,
+            fix_code_request.mode,
+            fix_code_request.fix_model,
+        )
+        # The agent is blocking, run it on the worker pool so the event loop stays free
+        agent_response = await agent_executor.run(agent_service.fix_issue_structured)
         print("agent_response", agent_response)
         return agent_response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def _format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+@router.post(path="/issue/stream")
+async def fix_code_stream(fix_code_request: FixCodeRequest):
+    """Streams tool calls, tool results and model messages as Server-Sent Events, ending with a summary event"""
+    if fix_code_request.mode != "react":
+        # Pipeline runs have no model steps to stream
+        raise HTTPException(
+            status_code=400,
+            detail=f"Streaming is only available in react mode; use /api/fix/issue/structured or /api/fix/jobs for {fix_code_request.mode} mode",
+        )
+    agent_service: AgentService = AgentService(
+        fix_code_request.github_credentials,
+        fix_code_request.issue_data,
+        fix_code_request.mode,
+        fix_code_request.fix_model,
+    )
+
+    async def event_stream():
+        try:
+            async with agent_executor.slot():
+                async for event in agent_service.stream_fix_issue():
+                    yield _format_sse(event)
+        except Exception as e:
+            # Headers are already sent, so errors are reported as a final event
+            yield _format_sse({"event": "error", "data": {"detail": str(getattr(e, "detail", e))}})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+from app.models.models import AgentJob, AgentJobProgress, FinalAgentOutput
+from app.routers.AgentRoutes import FixCodeRequest
+from app.services.JobService import job_service
+
+
+router = APIRouter(prefix="/fix/jobs", tags=["jobs"])
+
+def _get_job_or_404(job_id: str) -> AgentJob:
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.post(path="", status_code=202)
+async def submit_fix_job(fix_code_request: FixCodeRequest):
+    """Queues the issue for the agent and returns the job id immediately"""
+    job = job_service.submit(
+        fix_code_request.github_credentials,
+        fix_code_request.issue_data,
+        fix_code_request.mode,
+        fix_code_request.fix_model,
+    )
+    return {"job_id": job.job_id, "status": job.status}
+
+@router.get(path="/{job_id}", response_model=AgentJob)
+async def get_fix_job(job_id: str):
+    """Status, progress and (once finished) result of a job"""
+    return _get_job_or_404(job_id)
+
+@router.get(path="/{job_id}/progress", response_model=AgentJobProgress)
+async def get_fix_job_progress(job_id: str):
+    """Current step and tool of a running job"""
+    return _get_job_or_404(job_id).progress
+
+@router.get(path="/{job_id}/result", response_model=FinalAgentOutput)
+async def get_fix_job_result(job_id: str):
+    """Final agent output; 409 while the job has not succeeded"""
+    job = _get_job_or_404(job_id)
+    if job.status != "succeeded":
+        detail = job.error if job.status == "failed" else f"Job is {job.status}"
+        raise HTTPException(status_code=409, detail=detail)
+    return job.result
+
+@router.post(path="/{job_id}/cancel", response_model=AgentJob)
+async def cancel_fix_job(job_id: str):
+    """Cancels a queued job, or stops a running one at its next step"""
+    _get_job_or_404(job_id)
+    return job_service.cancel(job_id)
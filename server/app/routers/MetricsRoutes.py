@@ -0,0 +1,69 @@
+from fastapi import APIRouter
+from app.services.AgentExecutor import agent_executor
+from app.services.FixCache import fix_cache
+from app.services.GitHubGateway import github_gateway
+from app.services.GitHubRateLimiter import github_rate_limiter
+from app.services.InferenceScheduler import inference_scheduler
+from app.services.ModelRegistry import model_registry
+from app.services.ModelRouter import model_router
+from app.services.RunMetrics import fix_metrics, run_metrics
+from app.services.SnapshotCache import snapshot_cache
+from app.services.SymbolIndex import symbol_index_store
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get(path="/models")
+async def model_pool_stats():
+    """Load, eviction and memory stats of the warm model pool"""
+    return model_registry.stats()
+
+@router.get(path="/snapshots")
+async def snapshot_cache_stats():
+    """Hit/miss counters and sizes of the repository snapshot cache"""
+    return snapshot_cache.stats()
+
+@router.get(path="/agents")
+async def agent_executor_stats():
+    """Concurrency, queue depth and run time of the agent worker pool"""
+    return agent_executor.stats()
+
+@router.get(path="/runs")
+async def agent_run_stats():
+    """Latency and LLM calls per execution mode (react vs pipeline)"""
+    return run_metrics.stats()
+
+@router.get(path="/symbols")
+async def symbol_index_stats():
+    """Full vs incremental symbol index builds and files parsed/reused"""
+    return symbol_index_store.stats()
+
+@router.get(path="/fixes")
+async def fix_model_stats():
+    """Fix model latency, output size and success rate per output format, and tool retry rate"""
+    return fix_metrics.stats()
+
+@router.get(path="/inference")
+async def inference_scheduler_stats():
+    """Batch sizes, queue wait and batch time of the fix model inference scheduler"""
+    return inference_scheduler.stats()
+
+@router.get(path="/fix-cache")
+async def fix_cache_stats():
+    """Hits (exact and adapted), misses and rejected entries of the fix result cache"""
+    return fix_cache.stats() if fix_cache is not None else {"backend": "off"}
+
+@router.get(path="/router")
+async def model_router_stats():
+    """Routing decisions, escalations and per-model latency of the fix model router"""
+    return model_router.stats()
+
+@router.get(path="/github")
+async def github_gateway_stats():
+    """Pooled GitHub clients, memoized repositories and conditional-request cache of the GitHub gateway"""
+    return github_gateway.stats()
+
+@router.get(path="/github/tokens")
+async def github_token_budgets():
+    """Per-token GitHub rate-limit budgets, pacing and retries of the GitHub rate limiter"""
+    return github_rate_limiter.stats()
@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException
+
+
+class AgentExecutor:
+    """
+    Bounded worker pool that runs the blocking agent off the event loop.
+
+    At most `max_workers` agent runs execute at once per worker process; up to
+    `max_queue` more wait for a free slot and anything beyond that is rejected
+    with a 503, so health checks and other requests stay responsive.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, mode: str = "thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown agent executor mode: {mode}")
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.mode = mode
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_run_seconds = 0.0
+        self._total_wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs `func(*args)` on the pool and waits for its result."""
+        async with self.slot():
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Holds one of the `max_workers` agent slots for the duration of the block.
+        Used directly by agent runs that drive themselves from the event loop (streaming).
+        """
+        if self._queued >= self.max_queue and self._running >= self.max_workers:
+            self._rejected += 1
+            raise HTTPException(status_code=503, detail="Agent queue is full, please retry later")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        enqueued_at = time.perf_counter()
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+
+        started_at = time.perf_counter()
+        self._total_wait_seconds += started_at - enqueued_at
+        self._running += 1
+        try:
+            yield
+            self._completed += 1
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._running -= 1
+            self._total_run_seconds += time.perf_counter() - started_at
+            self._slots.release()
+
+    def stats(self) -> dict:
+        finished = self._completed + self._failed
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queue_depth": self._queued,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_run_seconds": round(self._total_run_seconds / finished, 3) if finished else 0.0,
+            "avg_wait_seconds": round(self._total_wait_seconds / finished, 3) if finished else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn avoids forking a process that already runs an event loop and model threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent")
+        return self._executor
+
+
+agent_executor = AgentExecutor(
+    max_workers=int(os.getenv("CODEMEDIC_AGENT_WORKERS", "4")),
+    max_queue=int(os.getenv("CODEMEDIC_AGENT_MAX_QUEUE", "32")),
+    mode=os.getenv("CODEMEDIC_AGENT_EXECUTOR", "thread"),
+)
@@ -1,19 +1,41 @@
+from typing import AsyncIterator, List, Optional
+
 from fastapi import HTTPException
-from app.models.models import GitHubIssue, GitHubCredentials
+from langchain_core.callbacks import BaseCallbackHandler
+from app.models.models import AgentMode, GitHubIssue, GitHubCredentials
+from app.services.CodeFixer import requested_fix_model
+from app.services.PipelineAgent import PipelineAgent
 from app.services.ReactAgent import ReactAgent
 
 
 class AgentService:
-    def __init__(self, github_credentials: GitHubCredentials, issue_data: GitHubIssue):
+    def __init__(
+            self,
+            github_credentials: GitHubCredentials,
+            issue_data: GitHubIssue,
+            mode: AgentMode = "react",
+            fix_model: Optional[str] = None,
+    ):
         self.issue_data = issue_data
         self.github_credentials = github_credentials
+        self.mode = mode
+        self.fix_model = fix_model
     
-    def fix_issue_structured(self):
+    def fix_issue_structured(self, callbacks: Optional[List[BaseCallbackHandler]] = None):
         """New fix_issue method using StructuredAgent with JsonOutputParser"""
         try:
-            react_agent = ReactAgent(self.github_credentials)
-            agent_response=react_agent.run(self.issue_data)
+            # "pipeline" drives the fixed workflow in code, "react" lets the LLM plan every step
+            agent_class = PipelineAgent if self.mode == "pipeline" else ReactAgent
+            react_agent = agent_class(self.github_credentials)
+            with requested_fix_model(self.fix_model):
+                agent_response=react_agent.run(self.issue_data, callbacks=callbacks)
             return agent_response
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
-                
+
+    async def stream_fix_issue(self) -> AsyncIterator[dict]:
+        """Streams the ReactAgent run as progress events (see ReactAgent.astream)"""
+        react_agent = ReactAgent(self.github_credentials)
+        with requested_fix_model(self.fix_model):
+            async for event in react_agent.astream(self.issue_data):
+                yield event
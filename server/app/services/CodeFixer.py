@@ -0,0 +1,289 @@
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+
+from app.models.models import FixOutputFormat
+from app.services.CodeRegion import (
+    breaks_parsing,
+    build_region_context,
+    extract_region,
+    is_valid_splice,
+    locate_region,
+    region_max_new_tokens,
+    splice_region,
+)
+from app.services.CpuInference import CPU_QUANTIZATION, INFERENCE_DEVICE
+from app.services.InferenceScheduler import inference_scheduler
+from app.services.FixCache import fix_cache, fix_cache_key
+from app.services.ModelRegistry import CONSTRAINED_DECODING, DEFAULT_FIX_MODEL_ID, DEFAULT_PIPELINE_KWARGS
+from app.services.ModelRouter import model_router
+from app.services.PatchApplier import apply_unified_diff, extract_unified_diff
+from app.services.RunMetrics import count_fix_llm_calls, fix_metrics
+
+_THINK_BLOCK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# "full": the model rewrites the whole code; "diff": it only writes a unified diff
+FIX_OUTPUT_FORMAT: FixOutputFormat = os.getenv("CODEMEDIC_FIX_OUTPUT_FORMAT", "full")
+# A diff for a typical bug is a few hunks; anything longer is better served by full-code mode
+DIFF_MAX_NEW_TOKENS = 400
+
+# Fix model (adapter id) requested for the current agent run; None lets the model router choose
+_requested_fix_model: ContextVar[Optional[str]] = ContextVar("requested_fix_model", default=None)
+
+
+@contextmanager
+def requested_fix_model(model_id: Optional[str]) -> Iterator[None]:
+    """Fixes generated inside the block (tools included) use `model_id` instead of the routed model."""
+    token = _requested_fix_model.set(model_id)
+    try:
+        yield
+    finally:
+        _requested_fix_model.reset(token)
+
+
+def build_fix_messages(buggy_code: str, context: Optional[str] = None, output_format: FixOutputFormat = "full") -> list:
+    # The adapter was fine-tuned on the plain prompt; the context block is only added for region fixes
+    context_block = f"""
+               Context (for reference only, do not include it in the answer):
+               {context}
+""" if context else ""
+    if output_format == "diff":
+        answer_format = """Respond only with a unified diff of your changes against the code below, with 2 lines of context:
+               ```diff
+               --- a/code.py
+               +++ b/code.py
+               @@ -1,3 +1,3 @@
+               ```"""
+    else:
+        answer_format = """Respond only with JSON using this format:
+               { "fixed_code": "..." }"""
+    return [
+        SystemMessage(content="You're a helpful code assistant"),
+        HumanMessage(
+            content=f"""
+               Fix the following buggy Python code. {answer_format}
+{context_block}
+               Code:
+               {buggy_code}
+            """
+        ),
+    ]
+
+
+def generate_fix(
+        buggy_code: str,
+        model_id: str = DEFAULT_FIX_MODEL_ID,
+        context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        output_format: FixOutputFormat = "full",
+        constrained: bool = False,
+) -> BaseMessage:
+    """
+    Runs the fine-tuned fix model on `buggy_code` and returns its raw chat message.
+    With `constrained`, full-code answers are decoded against the `FixedCodeIssue`
+    JSON schema, so they always parse.
+    """
+    messages = build_fix_messages(buggy_code, context, output_format)
+    print("prompt: ", messages)
+    # Runs on the warm pooled model, batched with concurrent fix requests
+    result = inference_scheduler.generate(
+        model_id,
+        messages,
+        max_new_tokens=max_new_tokens,
+        constrained=constrained and output_format == "full",
+    )
+    print("fine_tuned mode result: ", result)
+    return result
+
+
+def generate_fixed_code(
+        buggy_code: str,
+        model_id: Optional[str] = None,
+        context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        output_format: Optional[FixOutputFormat] = None,
+        use_cache: bool = True,
+) -> Tuple[Optional[str], int]:
+    """
+    Fixed version of `buggy_code` and the number of model calls it took.
+
+    Unless `model_id` is given (or requested for the run, see
+    `requested_fix_model`), the model router picks the small or the large fix
+    adapter and escalates to the large one when the small one's answer fails
+    validation. Results are served from the fix cache when the same (normalized)
+    code was already fixed with the same settings; `use_cache=False` bypasses the
+    lookup. In "diff" mode the model only writes a unified diff, which is applied
+    to the original code; if the diff does not apply (or breaks parsing) the fix
+    falls back to the full-code contract. Returns (None, calls) if no usable fix
+    came back.
+    """
+    settings = (context, max_new_tokens, output_format or FIX_OUTPUT_FORMAT, use_cache)
+    fixed_code, llm_calls = _route_fix(buggy_code, model_id or _requested_fix_model.get(), settings)
+    # Generation runs on the inference scheduler, where LangChain callbacks never see it
+    count_fix_llm_calls(llm_calls)
+    return fixed_code, llm_calls
+
+
+def _route_fix(buggy_code: str, model_id: Optional[str], settings: tuple) -> Tuple[Optional[str], int]:
+    if model_id is not None:
+        return _fix_with_model(buggy_code, model_id, *settings)
+
+    routed_model_id, _ = model_router.route(buggy_code)
+    fixed_code, llm_calls = _fix_with_model(buggy_code, routed_model_id, *settings)
+    if routed_model_id == model_router.large_model_id:
+        return fixed_code, llm_calls
+    if fixed_code is not None and model_router.accepts(buggy_code, fixed_code):
+        return fixed_code, llm_calls
+
+    model_router.record_escalation("no usable fix" if fixed_code is None else "failed validation")
+    print(f"⬆️ Escalating fix to `{model_router.large_model_id}`")
+    fixed_code, escalated_llm_calls = _fix_with_model(buggy_code, model_router.large_model_id, *settings)
+    return fixed_code, llm_calls + escalated_llm_calls
+
+
+def _fix_with_model(
+        buggy_code: str,
+        model_id: str,
+        context: Optional[str],
+        max_new_tokens: Optional[int],
+        output_format: FixOutputFormat,
+        use_cache: bool,
+) -> Tuple[Optional[str], int]:
+    cache_key = None
+    if fix_cache is not None:
+        cache_key = fix_cache_key(
+            buggy_code,
+            model_id=model_id,
+            context=context,
+            max_new_tokens=max_new_tokens,
+            output_format=output_format,
+            constrained=CONSTRAINED_DECODING,
+            pipeline_kwargs=DEFAULT_PIPELINE_KWARGS,
+            # Quantized CPU weights can answer differently from the full-precision model
+            quantization=CPU_QUANTIZATION if INFERENCE_DEVICE == "cpu" else "none",
+        )
+        cached = fix_cache.get(cache_key, buggy_code) if use_cache else None
+        if cached is not None:
+            print("♻️ Fix served from the fix cache")
+            return cached, 0
+
+    started = time.perf_counter()
+    fixed_code, llm_calls = _generate_fixed_code(buggy_code, model_id, context, max_new_tokens, output_format)
+    model_router.record(model_id, time.perf_counter() - started, fixed_code is not None)
+    if fixed_code is not None and cache_key is not None:
+        fix_cache.put(cache_key, buggy_code, fixed_code)
+    return fixed_code, llm_calls
+
+
+def _generate_fixed_code(
+        buggy_code: str,
+        model_id: str,
+        context: Optional[str],
+        max_new_tokens: Optional[int],
+        output_format: FixOutputFormat,
+) -> Tuple[Optional[str], int]:
+    llm_calls = 0
+    if output_format == "diff":
+        started = time.perf_counter()
+        result = generate_fix(
+            buggy_code,
+            model_id=model_id,
+            context=context,
+            max_new_tokens=min(max_new_tokens or DIFF_MAX_NEW_TOKENS, DIFF_MAX_NEW_TOKENS),
+            output_format="diff",
+        )
+        llm_calls += 1
+        content = str(result.content)
+        patch = extract_unified_diff(content)
+        fixed_code = apply_unified_diff(buggy_code, patch) if patch else None
+        applied = fixed_code is not None and fixed_code != buggy_code and not breaks_parsing(buggy_code, fixed_code)
+        fix_metrics.record("diff", time.perf_counter() - started, len(content), applied)
+        if applied:
+            return fixed_code, llm_calls
+        print("⚠️ The fix model's diff did not apply, falling back to full-code mode")
+
+    started = time.perf_counter()
+    result = generate_fix(
+        buggy_code,
+        model_id=model_id,
+        context=context,
+        max_new_tokens=max_new_tokens,
+        constrained=CONSTRAINED_DECODING,
+    )
+    llm_calls += 1
+    content = str(result.content)
+    fixed_code = parse_fixed_code(content)
+    if fixed_code is not None and breaks_parsing(buggy_code, fixed_code):
+        print("⚠️ The fixed code no longer parses")
+        fixed_code = None
+    metrics_key = "full (constrained)" if CONSTRAINED_DECODING else "full"
+    fix_metrics.record(metrics_key, time.perf_counter() - started, len(content), fixed_code is not None)
+    return fixed_code, llm_calls
+
+
+def generate_region_fix(
+        source: str,
+        line: Optional[int] = None,
+        symbol: Optional[str] = None,
+        file_path: Optional[str] = None,
+        model_id: Optional[str] = None,
+        use_cache: bool = True,
+) -> Tuple[Optional[str], int]:
+    """
+    Fixes only the function/class around `line` (or named `symbol`) and splices it
+    back into `source`, so decode length follows the size of the bug rather than the
+    size of the file. Returns the whole fixed file, or None if the bug could not be
+    pinned to a region or the model's answer does not splice cleanly (callers then
+    fall back to fixing the whole file), along with the number of model calls made.
+    """
+    region = locate_region(source, line, symbol)
+    if region is None:
+        return None, 0
+    region_code = extract_region(source, region)
+    print(f"✂️ Fixing {region.kind} {region.name or ''} lines {region.start_line}-{region.end_line}"
+          f" ({len(region_code)} of {len(source)} chars)")
+    fixed_region, llm_calls = generate_fixed_code(
+        region_code,
+        model_id=model_id,
+        context=build_region_context(source, region, file_path),
+        max_new_tokens=region_max_new_tokens(region_code),
+        use_cache=use_cache,
+    )
+    if fixed_region is None:
+        return None, llm_calls
+    fixed_source = splice_region(source, region, fixed_region)
+    if not is_valid_splice(source, region, fixed_source):
+        print("⚠️ Region fix does not parse once spliced back")
+        return None, llm_calls
+    return fixed_source, llm_calls
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """Returns the last JSON object found in a model response, ignoring <think> blocks and code fences."""
+    text = _THINK_BLOCK_RE.sub("", text).strip()
+    text = _CODE_FENCE_RE.sub("", text).strip()
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        # strict=False accepts raw newlines inside strings, which the model often emits for code
+        parsed = json.loads(text[start:end + 1], strict=False)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def parse_fixed_code(content: str) -> Optional[str]:
+    """Extracts `fixed_code` from a fix model response, or None if it is not valid JSON."""
+    parsed = extract_json_object(content)
+    if parsed is None or not isinstance(parsed.get("fixed_code"), str):
+        return None
+    return parsed["fixed_code"]
@@ -0,0 +1,169 @@
+import ast
+import re
+import textwrap
+from typing import List, Optional, Tuple
+
+from app.models.models import CodeRegion
+
+# Lines kept on each side of the reported line when the file does not parse
+REGION_LINE_WINDOW = 15
+# Larger enclosing definitions (e.g. a whole class) fall back to the line window
+MAX_REGION_LINES = 200
+# Import lines repeated in the context header
+MAX_CONTEXT_IMPORTS = 20
+
+_IMPORT_LINE_RE = re.compile(r"^(?:import|from)\s+\S+")
+
+
+def locate_region(source: str, line: Optional[int] = None, symbol: Optional[str] = None) -> Optional[CodeRegion]:
+    """
+    Finds the smallest function or class that encloses `line`, or the definition
+    named `symbol` (e.g. `division`, `Calculator.add`). Unparsable files and oversized
+    definitions fall back to a window around `line`. Returns None if nothing pins
+    the bug down, in which case the whole file has to be fixed.
+    """
+    lines = source.splitlines()
+    if line is not None and not 1 <= line <= len(lines):
+        line = None
+    if line is None and not symbol:
+        return None
+
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        tree = None
+
+    if tree is not None:
+        definitions = _definitions(tree)
+        matches = []
+        if symbol:
+            symbol = symbol.split("(", 1)[0].strip().strip("`")
+            matches = [
+                definition for definition in definitions
+                if definition[1] == symbol or definition[1].endswith(f".{symbol}")
+            ]
+        if not matches and line is not None:
+            matches = [definition for definition in definitions if definition[2] <= line <= definition[3]]
+        if matches:
+            # Innermost definition: a method rather than its class
+            node, qualname, start_line, end_line = min(matches, key=lambda definition: definition[3] - definition[2])
+            if end_line - start_line < MAX_REGION_LINES or line is None:
+                return CodeRegion(
+                    kind="class" if isinstance(node, ast.ClassDef) else "function",
+                    name=qualname,
+                    start_line=start_line,
+                    end_line=end_line,
+                    indent=_indent_of(lines[start_line - 1]),
+                )
+
+    if line is None:
+        return None
+    start_line = max(1, line - REGION_LINE_WINDOW)
+    end_line = min(len(lines), line + REGION_LINE_WINDOW)
+    # Start the window at its least indented line so the extracted code dedents cleanly
+    indent = min((_indent_of(text) for text in lines[start_line - 1:end_line] if text.strip()), key=len, default="")
+    return CodeRegion(kind="window", start_line=start_line, end_line=end_line, indent=indent)
+
+
+def extract_region(source: str, region: CodeRegion) -> str:
+    """Source of `region`, dedented so it reads as top-level code."""
+    lines = source.splitlines()[region.start_line - 1:region.end_line]
+    return textwrap.dedent("\n".join(lines))
+
+
+def build_region_context(source: str, region: CodeRegion, file_path: Optional[str] = None) -> str:
+    """Compact header for the fix model: file, imports and the classes enclosing the region."""
+    lines = source.splitlines()
+    header = []
+    if file_path:
+        header.append(f"# File: {file_path}")
+    description = f"{region.kind} `{region.name}`" if region.name else "code"
+    header.append(f"# The code below is the {description} at lines {region.start_line}-{region.end_line} of this file.")
+
+    imports = [text for text in lines if _IMPORT_LINE_RE.match(text)][:MAX_CONTEXT_IMPORTS]
+    header.extend(imports)
+
+    # Enclosing class headers, outermost first, e.g. `class Calculator(Base):`
+    enclosing = []
+    current_indent = region.indent
+    for text in reversed(lines[:region.start_line - 1]):
+        indent = _indent_of(text)
+        if text.strip() and len(indent) < len(current_indent) and text.lstrip().startswith("class "):
+            enclosing.insert(0, text.rstrip())
+            current_indent = indent
+    header.extend(enclosing)
+    return "\n".join(header)
+
+
+def splice_region(source: str, region: CodeRegion, fixed_region: str) -> str:
+    """Replaces `region` in `source` with `fixed_region`, re-indented to its original level."""
+    lines = source.splitlines(keepends=True)
+    fixed_lines = textwrap.dedent(fixed_region.strip("\n")).splitlines()
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    replacement = [f"{region.indent}{text}" if text.strip() else "" for text in fixed_lines]
+    spliced = newline.join(replacement)
+    # Keep the line break that ended the region (absent only at the end of a file without one)
+    if region.end_line < len(lines) or (lines and lines[-1].endswith(("\n", "\r"))):
+        spliced += newline
+    return "".join(lines[:region.start_line - 1]) + spliced + "".join(lines[region.end_line:])
+
+
+def is_valid_splice(original: str, region: CodeRegion, spliced: str) -> bool:
+    """
+    A splice must leave the file parsable, unless the original already failed to
+    parse outside the region (the fix cannot be expected to repair that).
+    """
+    try:
+        ast.parse(original)
+    except SyntaxError as e:
+        if e.lineno is not None and not region.start_line <= e.lineno <= region.end_line:
+            return True
+    except ValueError:
+        return True
+    try:
+        ast.parse(spliced)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def breaks_parsing(original: str, fixed: str) -> bool:
+    """True if `original` parses as Python and `fixed` no longer does."""
+    try:
+        ast.parse(original)
+    except (SyntaxError, ValueError):
+        return False
+    try:
+        ast.parse(fixed)
+        return False
+    except (SyntaxError, ValueError):
+        return True
+
+
+def region_max_new_tokens(region_code: str) -> int:
+    """Decode budget for a region fix: roughly the size of the region plus JSON overhead."""
+    # ~3 characters per token for code, with headroom for the edit itself
+    budget = int(len(region_code) / 3 * 1.5) + 128
+    # Rounded up to a multiple of 256 so concurrent region fixes can share a generation batch
+    return max(256, min(2048, -(-budget // 256) * 256))
+
+
+def _definitions(tree: ast.AST) -> List[Tuple[ast.AST, str, int, int]]:
+    definitions = []
+    pending = [(tree, "")]
+    while pending:
+        node, scope = pending.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = f"{scope}.{child.name}" if scope else child.name
+                # Decorators belong to the definition they decorate
+                start_line = min([child.lineno] + [decorator.lineno for decorator in child.decorator_list])
+                definitions.append((child, qualname, start_line, child.end_lineno))
+                pending.append((child, qualname))
+            else:
+                pending.append((child, scope))
+    return definitions
+
+
+def _indent_of(text: str) -> str:
+    return text[:len(text) - len(text.lstrip())]
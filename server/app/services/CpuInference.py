@@ -0,0 +1,55 @@
+import os
+from typing import Any, Dict
+
+# "auto" keeps the pipeline's default placement; "cpu" runs the fix models on GPU-less hosts
+INFERENCE_DEVICE = os.getenv("CODEMEDIC_INFERENCE_DEVICE", "auto")
+# Weight quantization applied to models loaded on CPU: none | int8 | int4
+CPU_QUANTIZATION = os.getenv("CODEMEDIC_CPU_QUANTIZATION", "int8")
+# Intra-op threads for CPU inference; 0 leaves torch's default (one per physical core)
+CPU_THREADS = int(os.getenv("CODEMEDIC_CPU_THREADS", "0"))
+
+CPU_QUANTIZATIONS = ("none", "int8", "int4")
+
+
+def cpu_load_kwargs() -> Dict[str, Any]:
+    """Extra `HuggingFacePipeline.from_model_id` kwargs to load a model for CPU inference."""
+    import torch
+    # fp32 activations: the int8 kernels expect them and bf16 matmuls are slow without AVX-512
+    return {"device": -1, "model_kwargs": {"torch_dtype": torch.float32, "low_cpu_mem_usage": True}}
+
+
+def configure_threads(threads: int = CPU_THREADS) -> int:
+    """Sets torch's intra-op thread count (if `threads` > 0) and returns the one in effect."""
+    import torch
+    if threads > 0:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+
+def quantize_for_cpu(model, quantization: str = CPU_QUANTIZATION):
+    """
+    Quantizes the linear layers of `model` in place for CPU inference.
+
+    int8 uses torch's dynamic quantization (int8 weights, activations quantized on
+    the fly, fbgemm kernels); int4 stores 4-bit weights with optimum-quanto and
+    keeps the lm_head in full precision. Returns the quantized model.
+    """
+    if quantization not in CPU_QUANTIZATIONS:
+        raise ValueError(f"Unknown CPU quantization: {quantization}")
+    if quantization == "int8":
+        import torch
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if quantization == "int4":
+        from optimum.quanto import freeze, qint4, quantize
+        quantize(model, weights=qint4, exclude=["lm_head"])
+        freeze(model)
+    return model
+
+
+def process_rss_bytes() -> int:
+    """Resident set size of this process (Linux), 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
@@ -0,0 +1,254 @@
+import difflib
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import tokenize
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.models.models import CachedFix
+from app.services.CodeRegion import breaks_parsing
+
+# Tokens that do not change what the code does
+_IGNORED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+def normalize_code(code: str) -> str:
+    """
+    Code with comments, blank lines and insignificant whitespace removed, so that
+    re-submitted, reformatted or commented variants of a snippet share a cache key.
+    """
+    try:
+        tokens = [
+            (token.type, token.string)
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type not in _IGNORED_TOKENS
+        ]
+        return json.dumps(tokens)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Buggy code may not even tokenize: fall back to a line-based normalization
+        lines = [line.rstrip() for line in code.splitlines()]
+        return "\n".join(line for line in lines if line.strip() and not line.lstrip().startswith("#"))
+
+
+def fix_cache_key(code: str, **params) -> str:
+    """Key of a fix: normalized code plus everything that affects the generation (model, adapter, settings)."""
+    payload = json.dumps({"code": normalize_code(code), **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def transfer_fix(original_code: str, fixed_code: str, code: str) -> Optional[str]:
+    """
+    Re-applies the changes between `original_code` and `fixed_code` to `code`, a
+    variant of the original with other comments, blank lines or indentation.
+    Returns None if a changed line of the original cannot be found in `code`.
+    """
+    original_lines = original_code.splitlines()
+    fixed_lines = fixed_code.splitlines()
+    lines = code.splitlines()
+
+    # Original line index -> line index in `code`, matching lines regardless of surrounding whitespace
+    mapping = {}
+    matcher = difflib.SequenceMatcher(None, [line.strip() for line in original_lines], [line.strip() for line in lines], autojunk=False)
+    for tag, i1, i2, j1, _ in matcher.get_opcodes():
+        if tag == "equal":
+            mapping.update({i1 + k: j1 + k for k in range(i2 - i1)})
+
+    edits = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, original_lines, fixed_lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "replace" and i2 - i1 == j2 - j1:
+            # Line-for-line changes: each line can move independently (e.g. a comment added in between)
+            pairs = [(i1 + k, [fixed_lines[j1 + k]]) for k in range(i2 - i1)]
+        elif tag == "insert":
+            # Insert before the counterpart of original line i1, or after the last line at the end
+            if i1 < len(original_lines):
+                anchor = mapping.get(i1)
+            elif original_lines:
+                anchor = mapping[i1 - 1] + 1 if i1 - 1 in mapping else None
+            else:
+                anchor = 0
+            if anchor is None:
+                return None
+            edits.append((anchor, anchor, fixed_lines[j1:j2]))
+            continue
+        else:
+            targets = [mapping.get(index) for index in range(i1, i2)]
+            if None in targets or targets != list(range(targets[0], targets[0] + len(targets))):
+                return None
+            edits.append((targets[0], targets[-1] + 1, fixed_lines[j1:j2]))
+            continue
+        for index, replacement in pairs:
+            if index not in mapping:
+                return None
+            edits.append((mapping[index], mapping[index] + 1, replacement))
+
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        lines[start:end] = replacement
+    newline = "\r\n" if "\r\n" in code else "\n"
+    return newline.join(lines) + (newline if code.endswith("\n") else "")
+
+
+class FixCache(ABC):
+    """
+    Cache of fix model results with TTL and LRU eviction.
+
+    Entries are keyed by the normalized input code; when a lookup's code differs
+    from the cached original (other comments or formatting), the cached fix is
+    re-applied to it as a patch. A result is never returned if it fails to parse
+    while the input parsed.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "adapted_hits": 0, "misses": 0, "rejected": 0, "stores": 0}
+
+    def get(self, key: str, code: str) -> Optional[str]:
+        entry = self._load(key)
+        if entry is not None and (datetime.now(timezone.utc) - entry.created_at).total_seconds() > self.ttl_seconds:
+            self._delete(key)
+            entry = None
+        if entry is None:
+            self._count("misses")
+            return None
+
+        if entry.original_code == code:
+            fixed_code = entry.fixed_code
+        else:
+            fixed_code = transfer_fix(entry.original_code, entry.fixed_code, code)
+
+        if fixed_code is None or breaks_parsing(code, fixed_code):
+            self._count("rejected")
+            return None
+        self._count("hits" if entry.original_code == code else "adapted_hits")
+        return fixed_code
+
+    def put(self, key: str, code: str, fixed_code: str) -> None:
+        if breaks_parsing(code, fixed_code):
+            return
+        self._store(key, CachedFix(original_code=code, fixed_code=fixed_code, created_at=datetime.now(timezone.utc)))
+        self._count("stores")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["adapted_hits"] + self._counters["misses"] + self._counters["rejected"]
+            hits = self._counters["hits"] + self._counters["adapted_hits"]
+            return {
+                **self._counters,
+                "backend": type(self).__name__,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+            }
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[CachedFix]:
+        ...
+
+    @abstractmethod
+    def _store(self, key: str, entry: CachedFix) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+class InMemoryFixCache(FixCache):
+    """Default backend: entries live as long as the worker process."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self._entries: "OrderedDict[str, CachedFix]" = OrderedDict()
+
+    def _load(self, key: str) -> Optional[CachedFix]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, entry: CachedFix) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SqliteFixCache(FixCache):
+    """Durable backend: shared by every worker on the host and kept across restarts."""
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.db_path = db_path
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fixes (key TEXT PRIMARY KEY, data TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS fixes_last_used ON fixes (last_used)")
+
+    def _load(self, key: str) -> Optional[CachedFix]:
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute("SELECT data FROM fixes WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE fixes SET last_used = ? WHERE key = ?", (self._now(), key))
+        return CachedFix.model_validate_json(row[0])
+
+    def _store(self, key: str, entry: CachedFix) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO fixes (key, data, last_used) VALUES (?, ?, ?)",
+                (key, entry.model_dump_json(), self._now()),
+            )
+            # Evict least recently used entries beyond the limit
+            connection.execute(
+                "DELETE FROM fixes WHERE key IN (SELECT key FROM fixes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _delete(self, key: str) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM fixes WHERE key = ?", (key,))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _now() -> float:
+        return datetime.now(timezone.utc).timestamp()
+
+
+def create_fix_cache() -> Optional[FixCache]:
+    backend = os.getenv("CODEMEDIC_FIX_CACHE", "memory")
+    ttl_seconds = int(os.getenv("CODEMEDIC_FIX_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    max_entries = int(os.getenv("CODEMEDIC_FIX_CACHE_MAX_ENTRIES", "1000"))
+    if backend == "sqlite":
+        return SqliteFixCache(os.getenv("CODEMEDIC_FIX_CACHE_DB_PATH", "codemedic_fixes.db"), ttl_seconds, max_entries)
+    if backend == "memory":
+        return InMemoryFixCache(ttl_seconds, max_entries)
+    if backend == "off":
+        return None
+    raise ValueError(f"Unknown fix cache backend: {backend}")
+
+
+fix_cache = create_fix_cache()
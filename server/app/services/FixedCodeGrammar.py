@@ -0,0 +1,63 @@
+from typing import List, Optional, Tuple
+
+# The only document the fix model may produce: {"fixed_code": "<json string>"}
+PREFIX = '{"fixed_code":"'
+# Positions in PREFIX that may be preceded by whitespace (before `{`, the key, `:` and the value)
+_WHITESPACE_BEFORE = {0, 1, 13, 14}
+_WHITESPACE = " \t\n\r"
+_ESCAPABLE = '"\\/bfnrtu'
+
+# Decoder states: ("prefix", index of the next expected char), ("string", after a backslash),
+# ("tail", 0) between the closing quote and `}`, ("done", 0) once the object is closed
+State = Tuple[str, object]
+START: State = ("prefix", 0)
+DONE: State = ("done", 0)
+# Every state the grammar can reach
+STATES: List[State] = [("prefix", index) for index in range(len(PREFIX))] + [("string", False), ("string", True), ("tail", 0), DONE]
+
+
+def advance(state: State, char: str) -> Optional[State]:
+    """State after reading `char` in `state`, None if `char` leaves the grammar."""
+    phase, value = state
+    if phase == "prefix":
+        if char == PREFIX[value]:
+            return ("string", False) if value == len(PREFIX) - 1 else ("prefix", value + 1)
+        if char in _WHITESPACE and value in _WHITESPACE_BEFORE:
+            return state
+        return None
+    if phase == "string":
+        if value:
+            return ("string", False) if char in _ESCAPABLE else None
+        if char == "\\":
+            return ("string", True)
+        if char == '"':
+            return ("tail", 0)
+        # Raw newlines inside the string are accepted by the lenient parser
+        return state
+    if phase == "tail":
+        if char in _WHITESPACE:
+            return state
+        if char == "}":
+            return DONE
+    return None
+
+
+def advance_text(state: State, text: str) -> Optional[State]:
+    for char in text:
+        state = advance(state, char)
+        if state is None:
+            return None
+    return state
+
+
+def closing_text(state: State) -> str:
+    """Shortest text that closes the object from `state`, used when generation runs out of tokens."""
+    phase, value = state
+    if phase == "prefix":
+        return PREFIX[value:] + '"}'
+    if phase == "string":
+        # A pending backslash is completed as an escaped backslash
+        return '\\"}' if value else '"}'
+    if phase == "tail":
+        return "}"
+    return ""
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.services.CpuInference import INFERENCE_DEVICE
+from app.services.ModelRegistry import DEFAULT_PIPELINE_KWARGS, SMALL_FIX_MODEL_ID, model_registry
+from app.services.PromptCache import PromptCache
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class _Request:
+    def __init__(self, model_id: str, group: str, messages: List[BaseMessage], max_new_tokens: Optional[int], constrained: bool):
+        self.model_id = model_id
+        self.group = group
+        self.messages = messages
+        self.max_new_tokens = max_new_tokens
+        self.constrained = constrained
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def batch_key(self) -> Tuple[str, Optional[int], bool]:
+        # Only requests sharing weights (a model, or adapters of one shared base) and generation
+        # settings can run in the same generate call
+        return self.group, self.max_new_tokens, self.constrained
+
+
+class InferenceScheduler:
+    """
+    In-process scheduler for fix model generations.
+
+    Concurrent callers (agent runs on different workers) enqueue their requests and
+    block on a future; a single scheduler thread drains the queue into dynamic
+    batches of up to `max_batch_size` compatible requests, waiting at most
+    `max_wait_ms` for a batch to fill, and runs each batch as one padded generate
+    call. New requests join at the next batch boundary. Requests for different
+    adapters of one shared base model batch together, each row running its own
+    adapter.
+
+    Optionally, generation is speculative: either the small fix adapter drafts
+    `speculative_lookahead` tokens that the target model verifies in one forward
+    pass ("draft"), or drafts are copied from the prompt ("prompt_lookup"). Both
+    run one sequence per generate call.
+
+    With `prompt_cache`, single-request batches start from the cached KV of the
+    prompt prefix shared with earlier fix requests (see PromptCache), which cuts
+    prefill time where it hurts most: CPU inference.
+    """
+
+    def __init__(
+            self,
+            max_batch_size: int = 8,
+            max_wait_ms: int = 20,
+            speculative_mode: str = "off",
+            speculative_lookahead: int = 8,
+            draft_model_id: str = SMALL_FIX_MODEL_ID,
+            prompt_cache: bool = False,
+    ):
+        if speculative_mode not in ("off", "draft", "prompt_lookup"):
+            raise ValueError(f"Unknown speculative decoding mode: {speculative_mode}")
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0, max_wait_ms)
+        self.speculative_mode = speculative_mode
+        self.speculative_lookahead = max(1, speculative_lookahead)
+        self.draft_model_id = draft_model_id
+        self.prompt_cache = PromptCache() if prompt_cache else None
+        self._pending: List[_Request] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {"requests": 0, "batches": 0, "batched_requests": 0, "max_batch_size_seen": 0, "failed_batches": 0}
+        self._queue_wait_seconds: List[float] = []
+        self._batch_seconds: List[float] = []
+
+    def generate(
+            self,
+            model_id: str,
+            messages: List[BaseMessage],
+            max_new_tokens: Optional[int] = None,
+            constrained: bool = False,
+    ) -> BaseMessage:
+        """Generates the model's answer to `messages`, sharing a batch with concurrent callers."""
+        chat_model = model_registry.get(model_id)
+        if getattr(chat_model.llm, "pipeline", None) is None:
+            # Remote endpoints batch on their side
+            return chat_model.invoke(messages)
+
+        request = _Request(model_id, model_registry.batch_group(model_id), messages, max_new_tokens, constrained)
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append(request)
+            self._counters["requests"] += 1
+            self._condition.notify()
+        return request.future.result()
+
+    def stats(self) -> dict:
+        with self._condition:
+            batches = self._counters["batches"]
+            waits = sorted(self._queue_wait_seconds)
+            return {
+                **self._counters,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "speculative_mode": self.speculative_mode,
+                "speculative_lookahead": self.speculative_lookahead,
+                "pending": len(self._pending),
+                "avg_batch_size": round(self._counters["batched_requests"] / batches, 2) if batches else 0.0,
+                "queue_wait_p50_seconds": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "avg_batch_seconds": round(sum(self._batch_seconds) / len(self._batch_seconds), 3) if self._batch_seconds else 0.0,
+                "prompt_cache": self.prompt_cache.stats() if self.prompt_cache is not None else None,
+            }
+
+    def _ensure_thread(self) -> None:
+        # Caller must hold self._condition
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            self._run_batch(batch)
+
+    def _next_batch(self) -> List[_Request]:
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            # Give concurrent callers up to max_wait_ms to join the oldest request's batch
+            key = self._pending[0].batch_key
+            deadline = self._pending[0].enqueued_at + self.max_wait_ms / 1000
+            while True:
+                compatible = [request for request in self._pending if request.batch_key == key]
+                remaining = deadline - time.perf_counter()
+                if len(compatible) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            batch = compatible[:self.max_batch_size]
+            self._pending = [request for request in self._pending if request not in batch]
+            now = time.perf_counter()
+            self._queue_wait_seconds.extend(now - request.enqueued_at for request in batch)
+            del self._queue_wait_seconds[:-1000]
+            return batch
+
+    def _run_batch(self, batch: List[_Request]) -> None:
+        started = time.perf_counter()
+        try:
+            outputs = self._generate_batch(batch)
+        except Exception as e:
+            with self._condition:
+                self._counters["failed_batches"] += 1
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - started
+        with self._condition:
+            self._counters["batches"] += 1
+            self._counters["batched_requests"] += len(batch)
+            self._counters["max_batch_size_seen"] = max(self._counters["max_batch_size_seen"], len(batch))
+            self._batch_seconds.append(elapsed)
+            del self._batch_seconds[:-1000]
+        print(f"🧮 Generated a batch of {len(batch)} fix request(s) in {elapsed:.1f}s")
+        for request, text in zip(batch, outputs):
+            request.future.set_result(AIMessage(content=text))
+
+    def _generate_batch(self, batch: List[_Request]) -> List[str]:
+        first = batch[0]
+        pipeline = model_registry.get(first.model_id).llm.pipeline
+        for request in batch[1:]:
+            # Reloads any adapter evicted while its request was queued
+            model_registry.get(request.model_id)
+        # Adapters attached from other threads swap the shared base's model; not while it generates
+        with model_registry.generation_lock(first.model_id):
+            return self._generate_with(pipeline, batch)
+
+    def _generate_with(self, pipeline, batch: List[_Request]) -> List[str]:
+        first = batch[0]
+        # Per-row LoRA adapter for models served from a shared base (PEFT mixed-adapter batches)
+        adapter_names = [model_registry.adapter_name(request.model_id) for request in batch]
+        adapter_kwargs = {"adapter_names": adapter_names} if any(adapter_names) else {}
+        tokenizer = pipeline.tokenizer
+        # Decoder-only models must be left-padded so every row continues from its own last token
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+        prompts = [
+            tokenizer.apply_chat_template(
+                [{"role": _ROLES.get(message.type, "user"), "content": message.content} for message in request.messages],
+                tokenize=False,
+                add_generation_prompt=True,
+            )
+            for request in batch
+        ]
+        speculative_kwargs = self._speculative_kwargs(first.model_id)
+        if speculative_kwargs:
+            # Assisted generation only supports one sequence per generate call
+            return [
+                pipeline(
+                    prompt,
+                    return_full_text=False,
+                    **({"adapter_names": [name]} if name else {}),
+                    **self._generate_kwargs(first, pipeline),
+                    **speculative_kwargs,
+                )[0]["generated_text"]
+                for prompt, name in zip(prompts, adapter_names)
+            ]
+
+        if self.prompt_cache is not None and len(prompts) == 1:
+            # The chat template already holds the special tokens, so neither tokenization adds any
+            token_ids = tokenizer(prompts[0], add_special_tokens=False)["input_ids"]
+            past_key_values = self.prompt_cache.past_key_values(pipeline.model, token_ids, adapter_names[0])
+            if past_key_values is not None:
+                result = pipeline(
+                    prompts[0],
+                    return_full_text=False,
+                    add_special_tokens=False,
+                    past_key_values=past_key_values,
+                    **adapter_kwargs,
+                    **self._generate_kwargs(first, pipeline),
+                )
+                return [result[0]["generated_text"]]
+
+        # batch_size == len(prompts) keeps the whole batch in a single generate call
+        results = pipeline(prompts, batch_size=len(prompts), return_full_text=False, **adapter_kwargs, **self._generate_kwargs(first, pipeline))
+        return [result[0]["generated_text"] for result in results]
+
+    @staticmethod
+    def _generate_kwargs(request: _Request, pipeline) -> Dict[str, object]:
+        generate_kwargs: Dict[str, object] = {}
+        if request.max_new_tokens is not None:
+            generate_kwargs["max_new_tokens"] = request.max_new_tokens
+        if request.constrained:
+            # One processor per generate call: it tracks every row of the batch
+            from transformers import LogitsProcessorList
+            from app.services.JsonConstraint import fixed_code_logits_processor
+            max_new_tokens = request.max_new_tokens or DEFAULT_PIPELINE_KWARGS["max_new_tokens"]
+            generate_kwargs["logits_processor"] = LogitsProcessorList([fixed_code_logits_processor(pipeline, max_new_tokens)])
+        return generate_kwargs
+
+    def _speculative_kwargs(self, model_id: str) -> Dict[str, object]:
+        """
+        Generate kwargs for speculative decoding. Fixes mostly copy the input code, so
+        drafted tokens are accepted in long runs; greedy verification keeps the output
+        identical to plain decoding.
+        """
+        if self.speculative_mode == "prompt_lookup":
+            # Model-free drafting: candidate tokens are n-gram continuations copied from the prompt
+            return {"prompt_lookup_num_tokens": self.speculative_lookahead}
+        if self.speculative_mode == "draft" and model_id != self.draft_model_id:
+            # Same Qwen3 tokenizer on both sides, so the draft model's tokens are verified as is
+            draft_model = model_registry.get(self.draft_model_id).llm.pipeline.model
+            draft_adapter = model_registry.adapter_name(self.draft_model_id)
+            if draft_adapter:
+                # The draft runs outside the target's adapter hooks, so its own adapter must be active
+                draft_model.set_adapter(draft_adapter)
+            return {
+                "assistant_model": draft_model,
+                "num_assistant_tokens": self.speculative_lookahead,
+                "num_assistant_tokens_schedule": "constant",
+            }
+        return {}
+
+
+inference_scheduler = InferenceScheduler(
+    max_batch_size=int(os.getenv("CODEMEDIC_INFERENCE_MAX_BATCH", "8")),
+    max_wait_ms=int(os.getenv("CODEMEDIC_INFERENCE_MAX_WAIT_MS", "20")),
+    speculative_mode=os.getenv("CODEMEDIC_SPECULATIVE_DECODING", "off"),
+    speculative_lookahead=int(os.getenv("CODEMEDIC_SPECULATIVE_LOOKAHEAD", "8")),
+    draft_model_id=os.getenv("CODEMEDIC_DRAFT_MODEL", SMALL_FIX_MODEL_ID),
+    # Prefill dominates fix latency on CPU, so prefix reuse is on by default there
+    prompt_cache=os.getenv("CODEMEDIC_PROMPT_CACHE", "1" if INFERENCE_DEVICE == "cpu" else "0") == "1",
+)
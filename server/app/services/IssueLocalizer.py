@@ -0,0 +1,137 @@
+import difflib
+import posixpath
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.models.models import GitHubCredentials, GitHubIssue, LocalizedFile
+from app.services.GitHubGateway import github_gateway
+from app.services.SnapshotCache import snapshot_cache
+
+# `File "/abs/path/to/module.py", line 4, in division`
+_TRACEBACK_FRAME_RE = re.compile(r'File "(?P<path>[^"]+)", line (?P<line>\d+)(?:, in (?P<symbol>[\w<>.]+))?')
+# `src/module.py:12` or `module.js:12:5`
+_PATH_LINE_RE = re.compile(r"(?P<path>[\w./\\-]+\.[A-Za-z]{1,5}):(?P<line>\d+)")
+# Any token that looks like a source file name
+_FILE_NAME_RE = re.compile(r"(?P<path>[\w./\\-]*[\w-]+\.(?:py|pyi|js|jsx|ts|tsx|java|go|rb|rs|c|h|cpp|hpp|cs|php|kt|swift|scala|sh|ya?ml|json|toml|cfg|ini))\b")
+# `division(23, 0)` / `def division(` / `class Division`
+_IDENTIFIER_RE = re.compile(r"\b(?:def|class)\s+(?P<defined>[A-Za-z_]\w*)|\b(?P<called>[A-Za-z_]\w*)\s*\(")
+
+_IGNORED_IDENTIFIERS = {"print", "len", "str", "int", "float", "list", "dict", "set", "tuple", "range", "open", "type"}
+
+# Lines shown around a reported line number
+LINE_WINDOW = 10
+
+
+class IssueLocalizer:
+    """
+    Ranks the repository files an issue is about without any LLM call.
+
+    Paths and line numbers are pulled from tracebacks, `path:line` references and
+    file names in the issue body, then matched against an index of repository
+    paths by longest path suffix, with a fuzzy basename lookup as a fallback.
+    """
+
+    def __init__(self, file_paths: List[str]):
+        self._paths = list(file_paths)
+        self._by_basename: Dict[str, List[str]] = defaultdict(list)
+        self._by_stem: Dict[str, List[str]] = defaultdict(list)
+        for path in self._paths:
+            basename = posixpath.basename(path)
+            self._by_basename[basename.lower()].append(path)
+            self._by_stem[posixpath.splitext(basename)[0].lower()].append(path)
+
+    def localize(self, issue_text: str, limit: int = 5) -> List[LocalizedFile]:
+        candidates: Dict[str, LocalizedFile] = {}
+
+        # Deepest traceback frame is where the error surfaced: rank it first
+        frames = list(_TRACEBACK_FRAME_RE.finditer(issue_text))
+        for depth, match in enumerate(reversed(frames)):
+            line = int(match.group("line"))
+            for path, match_score in self._match_path(match.group("path")):
+                self._add(candidates, path, 10.0 + match_score - depth * 0.5, line, "traceback frame")
+
+        for match in _PATH_LINE_RE.finditer(issue_text):
+            for path, match_score in self._match_path(match.group("path")):
+                self._add(candidates, path, 6.0 + match_score, int(match.group("line")), "path:line reference")
+
+        for match in _FILE_NAME_RE.finditer(issue_text):
+            for path, match_score in self._match_path(match.group("path")):
+                self._add(candidates, path, 4.0 + match_score, None, "file name mentioned")
+
+        # Identifiers only hint at files named after them (e.g. `division` -> division.py)
+        for identifier in self._identifiers(issue_text):
+            for path in self._by_stem.get(identifier.lower(), []):
+                self._add(candidates, path, 2.0, None, f"identifier `{identifier}`")
+
+        ranked = sorted(candidates.values(), key=lambda candidate: candidate.score, reverse=True)
+        return ranked[:limit]
+
+    def _match_path(self, raw_path: str) -> List[Tuple[str, float]]:
+        """Returns repository paths matching `raw_path`, scored by how many trailing components agree."""
+        parts = [part for part in posixpath.normpath(raw_path.replace("\\", "/")).split("/") if part not in ("", ".")]
+        if not parts:
+            return []
+
+        basename = parts[-1].lower()
+        exact = self._by_basename.get(basename, [])
+        if exact:
+            scored = [(path, float(self._common_suffix_length(parts, path.split("/")))) for path in exact]
+            best = max(score for _, score in scored)
+            return [(path, score) for path, score in scored if score == best]
+
+        # Fuzzy basename lookup for typos and renamed files
+        close = difflib.get_close_matches(basename, list(self._by_basename.keys()), n=3, cutoff=0.8)
+        return [(path, 0.0) for name in close for path in self._by_basename[name]]
+
+    @staticmethod
+    def _common_suffix_length(left: List[str], right: List[str]) -> int:
+        length = 0
+        for left_part, right_part in zip(reversed(left), reversed(right)):
+            if left_part.lower() != right_part.lower():
+                break
+            length += 1
+        return length
+
+    @staticmethod
+    def _identifiers(issue_text: str) -> List[str]:
+        identifiers = []
+        for match in _IDENTIFIER_RE.finditer(issue_text):
+            identifier = match.group("defined") or match.group("called")
+            if identifier and identifier not in _IGNORED_IDENTIFIERS and identifier not in identifiers:
+                identifiers.append(identifier)
+        return identifiers
+
+    @staticmethod
+    def _add(candidates: Dict[str, LocalizedFile], path: str, score: float, line: Optional[int], reason: str) -> None:
+        candidate = candidates.get(path)
+        if candidate is None:
+            candidate = candidates[path] = LocalizedFile(path=path, score=0.0, reasons=[])
+        candidate.score = round(candidate.score + score, 2)
+        if reason not in candidate.reasons:
+            candidate.reasons.append(reason)
+        if line is not None and candidate.line is None:
+            candidate.line = line
+            candidate.start_line = max(1, line - LINE_WINDOW)
+            candidate.end_line = line + LINE_WINDOW
+
+
+def localize_issue(github_credentials: GitHubCredentials, github_issue: GitHubIssue, limit: int = 5) -> List[LocalizedFile]:
+    """Ranked candidate files for `github_issue`; empty if nothing in the issue points at a file."""
+    try:
+        repo = github_gateway.repo(github_credentials.token, github_credentials.repository_name)
+        tree = snapshot_cache.get_tree(repo)
+    except Exception as e:
+        print(f"⚠️ Could not index repository for localization: {str(e)}")
+        return []
+    candidates = IssueLocalizer(tree.file_paths()).localize(f"{github_issue.title}\n{github_issue.body}", limit)
+    print(f"📍 Localized candidates: {[candidate.path for candidate in candidates]}")
+    return candidates
+
+
+def format_candidates(candidates: List[LocalizedFile]) -> str:
+    lines = []
+    for candidate in candidates:
+        window = f" (lines {candidate.start_line}-{candidate.end_line}, reported line {candidate.line})" if candidate.line else ""
+        lines.append(f"- {candidate.path}{window} [{', '.join(candidate.reasons)}]")
+    return "\n".join(lines)
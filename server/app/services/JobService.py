@@ -0,0 +1,179 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.models.models import AgentJob, AgentJobProgress, AgentMode, GitHubCredentials, GitHubIssue
+from app.services.AgentExecutor import agent_executor
+from app.services.AgentService import AgentService
+from app.services.JobStore import FINISHED_STATUSES, job_store
+
+
+class JobCancelledError(Exception):
+    pass
+
+
+class JobProgressHandler(BaseCallbackHandler):
+    """Records the current step/tool of a job and aborts the run once cancellation is requested."""
+
+    raise_error = True
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.progress = AgentJobProgress()
+
+    def on_chat_model_start(self, serialized: dict, messages: List[Any], **kwargs: Any) -> None:
+        self._next_step()
+
+    def on_llm_start(self, serialized: dict, prompts: List[str], **kwargs: Any) -> None:
+        self._next_step()
+
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs: Any) -> None:
+        self._check_cancelled()
+        tool_name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self.progress.current_tool = tool_name
+        self.progress.tool_path.append(tool_name)
+        job_store.update(self.job_id, progress=self.progress.model_copy(deep=True))
+
+    def _next_step(self) -> None:
+        self._check_cancelled()
+        self.progress.step += 1
+        job_store.update(self.job_id, progress=self.progress.model_copy(deep=True))
+
+    def _check_cancelled(self) -> None:
+        job = job_store.get(self.job_id)
+        if job is not None and job.cancel_requested:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+
+
+def run_agent_job(
+        job_id: str,
+        github_credentials: GitHubCredentials,
+        issue_data: GitHubIssue,
+        mode: AgentMode,
+        fix_model: Optional[str] = None,
+) -> None:
+    """
+    Runs on an agent worker: executes the agent while reporting progress to the job
+    store, and records the outcome there. The worker may be another process, so
+    everything goes through the store rather than back to the caller.
+    """
+    job = job_store.get(job_id)
+    if job is None or job.status == "cancelled":
+        return
+    job_store.update(job_id, status="running")
+    try:
+        agent_service = AgentService(github_credentials, issue_data, mode, fix_model)
+        result = agent_service.fix_issue_structured(callbacks=[JobProgressHandler(job_id)])
+    except Exception as e:
+        job = job_store.get(job_id)
+        if job is not None and job.cancel_requested:
+            job_store.update(job_id, status="cancelled")
+        else:
+            job_store.update(job_id, status="failed", error=str(getattr(e, "detail", e)))
+        raise
+    job_store.update(job_id, status="succeeded", result=result)
+
+
+# Hands a job to a remote worker: dispatch(job_id, github_credentials, issue_data, mode, fix_model)
+JobDispatcher = Callable[[str, GitHubCredentials, GitHubIssue, AgentMode, Optional[str]], None]
+
+
+class JobService:
+    """
+    Local job queue in front of the agent worker pool.
+
+    Submitting returns immediately with a job id; queued jobs are picked up by as
+    many consumers as the pool has workers, so the pool itself never rejects them.
+    With a dispatcher set (e.g. a Modal function), jobs run there instead and are
+    followed through the shared job store.
+    """
+
+    def __init__(self):
+        if agent_executor.mode == "process" and not job_store.shared:
+            # Worker processes would report progress to, and read cancellation from, their own copy
+            raise ValueError("CODEMEDIC_AGENT_EXECUTOR=process needs a job store shared between processes (CODEMEDIC_JOB_STORE=sqlite)")
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers: List[asyncio.Task] = []
+        self._dispatch: Optional[JobDispatcher] = None
+
+    def set_dispatcher(self, dispatch: JobDispatcher) -> None:
+        """Runs jobs through `dispatch` instead of the local worker pool."""
+        if not job_store.shared:
+            # The remote worker would report progress to, and read cancellation from, a store the API never sees
+            raise ValueError("Dispatching jobs to remote workers needs a shared job store (CODEMEDIC_JOB_STORE=sqlite or modal)")
+        self._dispatch = dispatch
+
+    def submit(
+            self,
+            github_credentials: GitHubCredentials,
+            issue_data: GitHubIssue,
+            mode: AgentMode = "react",
+            fix_model: Optional[str] = None,
+    ) -> AgentJob:
+        now = datetime.now(timezone.utc)
+        job = AgentJob(
+            job_id=uuid.uuid4().hex,
+            status="queued",
+            repository=github_credentials.repository_name,
+            issue_number=issue_data.number,
+            mode=mode,
+            fix_model=fix_model,
+            created_at=now,
+            updated_at=now,
+        )
+        job_store.save(job)
+        # Credentials travel with the queue item or dispatch call only, they are never stored
+        if self._dispatch is not None:
+            try:
+                self._dispatch(job.job_id, github_credentials, issue_data, mode, fix_model)
+            except Exception as e:
+                return job_store.update(job.job_id, status="failed", error=f"Could not dispatch the job: {e}")
+            return job
+        self._ensure_consumers()
+        self._queue.put_nowait((job.job_id, github_credentials, issue_data))
+        return job
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        return job_store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AgentJob]:
+        """Queued jobs are dropped; running jobs stop at their next LLM or tool call."""
+        job = job_store.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        if job.status == "queued":
+            return job_store.update(job_id, status="cancelled", cancel_requested=True)
+        return job_store.update(job_id, cancel_requested=True)
+
+    def _ensure_consumers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._consumers = [consumer for consumer in self._consumers if not consumer.done()]
+        while len(self._consumers) < agent_executor.max_workers:
+            self._consumers.append(asyncio.create_task(self._consume()))
+
+    async def _consume(self) -> None:
+        while True:
+            job_id, github_credentials, issue_data = await self._queue.get()
+            try:
+                await self._run(job_id, github_credentials, issue_data)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, github_credentials: GitHubCredentials, issue_data: GitHubIssue) -> None:
+        job = job_store.get(job_id)
+        if job is None or job.status == "cancelled":
+            return
+        try:
+            await agent_executor.run(run_agent_job, job_id, github_credentials, issue_data, job.mode, job.fix_model)
+        except Exception as e:
+            # run_agent_job records its own failures; this catches the ones around it (pool full, dead worker process)
+            job = job_store.get(job_id)
+            if job is not None and job.status not in FINISHED_STATUSES:
+                job_store.update(job_id, status="failed", error=str(getattr(e, "detail", e)))
+
+
+job_service = JobService()
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.models.models import AgentJob
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobStore(ABC):
+    """Storage backend for agent jobs. Credentials are never persisted."""
+
+    # Whether agent workers in other processes see the same jobs (progress, cancellation)
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def save(self, job: AgentJob) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        ...
+
+    def update(self, job_id: str, **fields) -> Optional[AgentJob]:
+        """Applies `fields` to the stored job and bumps its updated_at."""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job = job.model_copy(update={**fields, "updated_at": datetime.now(timezone.utc)})
+            self.save(job)
+            return job
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Default store: jobs live as long as the worker process. Finished jobs (and
+    their results) are dropped `finished_ttl_seconds` after they finished, or
+    oldest first once more than `max_finished_jobs` are kept.
+    """
+
+    def __init__(self, finished_ttl_seconds: float = 3600.0, max_finished_jobs: int = 1000):
+        super().__init__()
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.max_finished_jobs = max(0, max_finished_jobs)
+        self._jobs: Dict[str, AgentJob] = {}
+        # Finished job ids in the order they finished, with the time they did
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+
+    def save(self, job: AgentJob) -> None:
+        now = time.monotonic()
+        with self._jobs_lock:
+            self._jobs[job.job_id] = job
+            if job.status in FINISHED_STATUSES and job.job_id not in self._finished:
+                self._finished[job.job_id] = now
+            self._evict_finished(now)
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def _evict_finished(self, now: float) -> None:
+        # Caller must hold self._jobs_lock
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished_jobs and now - finished_at < self.finished_ttl_seconds:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+
+class SqliteJobStore(JobStore):
+    """Durable store: job status and results survive restarts and are shared by every process."""
+
+    shared = True
+
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT NOT NULL)"
+            )
+
+    def save(self, job: AgentJob) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job.job_id, job.model_dump_json(), job.updated_at.isoformat()),
+            )
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return AgentJob.model_validate_json(row[0]) if row else None
+
+    def update(self, job_id: str, **fields) -> Optional[AgentJob]:
+        # Read and write in one write transaction: a worker process reporting progress
+        # must not overwrite a cancellation requested by the API process in between
+        with closing(self._connect()) as connection, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = AgentJob.model_validate_json(row[0]).model_copy(update={**fields, "updated_at": datetime.now(timezone.utc)})
+            connection.execute(
+                "UPDATE jobs SET data = ?, updated_at = ? WHERE job_id = ?",
+                (job.model_dump_json(), job.updated_at.isoformat(), job_id),
+            )
+            return job
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+
+class ModalDictJobStore(JobStore):
+    """Store for Modal deployments: jobs live in a named modal.Dict shared by every container."""
+
+    shared = True
+
+    def __init__(self, dict_name: str):
+        super().__init__()
+        import modal
+        self._jobs = modal.Dict.from_name(dict_name, create_if_missing=True)
+
+    def save(self, job: AgentJob) -> None:
+        self._jobs[job.job_id] = job.model_dump_json()
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        data = self._jobs.get(job_id)
+        return AgentJob.model_validate_json(data) if data else None
+
+
+def create_job_store() -> JobStore:
+    backend = os.getenv("CODEMEDIC_JOB_STORE", "memory")
+    if backend == "sqlite":
+        return SqliteJobStore(os.getenv("CODEMEDIC_JOB_DB_PATH", "codemedic_jobs.db"))
+    if backend == "modal":
+        return ModalDictJobStore(os.getenv("CODEMEDIC_JOB_DICT", "codemedic-jobs"))
+    if backend == "memory":
+        return InMemoryJobStore(
+            finished_ttl_seconds=float(os.getenv("CODEMEDIC_JOB_TTL_SECONDS", "3600")),
+            max_finished_jobs=int(os.getenv("CODEMEDIC_JOB_MAX_FINISHED", "1000")),
+        )
+    raise ValueError(f"Unknown job store backend: {backend}")
+
+
+job_store = create_job_store()
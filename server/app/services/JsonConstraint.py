@@ -0,0 +1,188 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from transformers import LogitsProcessor
+
+from app.services.FixedCodeGrammar import DONE, START, STATES, State, advance, advance_text, closing_text
+
+
+class _TokenTables:
+    """
+    Decoded vocabulary and the mask of allowed tokens for every decoder state,
+    shared by every request on a model. Built once, when the model is loaded (see
+    `prepare_fixed_code_constraint`), since decoding the vocabulary takes a while.
+    """
+
+    def __init__(self, tokenizer, vocab_size: int, eos_token_ids: List[int]):
+        self.vocab_size = vocab_size
+        self.eos_token_ids = eos_token_ids
+        texts = tokenizer.batch_decode([[token_id] for token_id in range(min(len(tokenizer), vocab_size))])
+        # Special and added tokens (chat markers, <think>) never belong inside the JSON document
+        excluded = set(tokenizer.all_special_ids) | set(tokenizer.get_added_vocab().values())
+        self.texts = [None if token_id in excluded or not text else text for token_id, text in enumerate(texts)]
+
+        # Most tokens never touch the string's delimiters: inside the string they are always allowed
+        plain_ids: List[int] = []
+        self._delimited: List[int] = []
+        self._by_first_char: Dict[str, List[int]] = {}
+        self._char_tokens: Dict[str, int] = {}
+        for token_id, text in enumerate(self.texts):
+            if text is None:
+                continue
+            (self._delimited if '"' in text or "\\" in text else plain_ids).append(token_id)
+            self._by_first_char.setdefault(text[0], []).append(token_id)
+            if len(text) == 1:
+                self._char_tokens.setdefault(text, token_id)
+        self._plain = torch.zeros(vocab_size, dtype=torch.bool)
+        if plain_ids:
+            self._plain[plain_ids] = True
+        self._masks: Dict[State, torch.Tensor] = {state: self._build_mask(state) for state in STATES}
+
+    def advance(self, state: State, token_id: int) -> Optional[State]:
+        if state == DONE:
+            return state
+        text = self.texts[token_id] if token_id < len(self.texts) else None
+        return advance_text(state, text) if text is not None else None
+
+    def mask(self, state: State) -> torch.Tensor:
+        return self._masks[state]
+
+    def closing_token(self, state: State) -> Optional[int]:
+        """Next token of the shortest way to close the object from `state`, None if already closed."""
+        text = closing_text(state)
+        return self._char_tokens.get(text[0]) if text else None
+
+    def closing_length(self, state: State) -> int:
+        return len(closing_text(state))
+
+    def _build_mask(self, state: State) -> torch.Tensor:
+        allowed = torch.zeros(self.vocab_size, dtype=torch.bool)
+        if state == DONE:
+            allowed[self.eos_token_ids] = True
+            return allowed
+        if state == ("string", False):
+            allowed |= self._plain
+            candidates = self._delimited
+        else:
+            # Only tokens whose first char is allowed here can be
+            candidates = [
+                token_id
+                for first_char, token_ids in self._by_first_char.items() if advance(state, first_char) is not None
+                for token_id in token_ids
+            ]
+        allowed_ids = [token_id for token_id in candidates if self.advance(state, token_id) is not None]
+        if allowed_ids:
+            allowed[allowed_ids] = True
+        return allowed
+
+
+_tables: Dict[Tuple[str, int], _TokenTables] = {}
+_tables_lock = threading.Lock()
+
+
+def _get_tables(tokenizer, vocab_size: int, eos_token_ids: List[int]) -> _TokenTables:
+    key = (tokenizer.name_or_path, vocab_size)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = _TokenTables(tokenizer, vocab_size, eos_token_ids)
+        return _tables[key]
+
+
+class FixedCodeLogitsProcessor(LogitsProcessor):
+    """
+    Constrains generation to the `FixedCodeIssue` schema, `{"fixed_code": "..."}`:
+    at every step, tokens that would leave the JSON grammar are masked out and the
+    end-of-sequence token is only allowed once the object is closed, so the output
+    always parses. When `max_new_tokens` is about to run out, the shortest closing
+    sequence (`"}`) is forced instead, so a truncated answer still parses (its code
+    is cut short, which the caller's parse check rejects). One instance per
+    generate call (it tracks the decoder state).
+    """
+
+    def __init__(self, tokenizer, eos_token_ids: List[int], max_new_tokens: Optional[int] = None):
+        self.tokenizer = tokenizer
+        self.eos_token_ids = eos_token_ids
+        self.max_new_tokens = max_new_tokens
+        self.truncated_rows = 0
+        self._tables: Optional[_TokenTables] = None
+        self._prompt_length = 0
+        self._tokens: List[List[int]] = []
+        self._states: List[List[Optional[State]]] = []
+        self._closing: List[bool] = []
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if self._tables is None:
+            # First step: nothing generated yet
+            self._tables = _get_tables(self.tokenizer, scores.shape[-1], self.eos_token_ids)
+            self._prompt_length = input_ids.shape[1]
+            self._tokens = [[] for _ in range(input_ids.shape[0])]
+            self._states = [[START] for _ in range(input_ids.shape[0])]
+            self._closing = [False] * input_ids.shape[0]
+
+        for row in range(input_ids.shape[0]):
+            generated = input_ids[row, self._prompt_length:].tolist()
+            state = self._advance_row(row, generated)
+            # A row that somehow left the grammar is no longer constrained
+            if state is None:
+                continue
+            closing_token = self._closing_token(row, state, len(generated))
+            if closing_token is not None:
+                forced = torch.full_like(scores[row], float("-inf"))
+                forced[closing_token] = 0.0
+                scores[row] = forced
+            else:
+                mask = self._tables.mask(state).to(scores.device)
+                scores[row] = scores[row].masked_fill(~mask, float("-inf"))
+        return scores
+
+    def _closing_token(self, row: int, state: State, generated_length: int) -> Optional[int]:
+        """The token to force when only the tokens needed to close the object are left, else None."""
+        if self.max_new_tokens is None:
+            return None
+        remaining = self.max_new_tokens - generated_length
+        if remaining > self._tables.closing_length(state):
+            return None
+        closing_token = self._tables.closing_token(state)
+        if closing_token is not None and not self._closing[row]:
+            self._closing[row] = True
+            self.truncated_rows += 1
+            print("✂️ Constrained fix reached max_new_tokens, closing the JSON early")
+        return closing_token
+
+    def _advance_row(self, row: int, generated: List[int]) -> Optional[State]:
+        """
+        State after `generated`. Usually one token longer than the last call, but
+        speculative decoding rolls rejected draft tokens back, so the states of
+        the longest common prefix are kept and the rest is replayed.
+        """
+        tokens, states = self._tokens[row], self._states[row]
+        common = 0
+        while common < min(len(tokens), len(generated)) and tokens[common] == generated[common]:
+            common += 1
+        del tokens[common:]
+        del states[common + 1:]
+        for token_id in generated[common:]:
+            state = states[-1]
+            states.append(self._tables.advance(state, token_id) if state is not None else None)
+            tokens.append(token_id)
+        return states[-1]
+
+
+def _eos_token_ids(pipeline) -> List[int]:
+    eos_token_id = pipeline.model.generation_config.eos_token_id
+    if eos_token_id is None:
+        eos_token_id = pipeline.tokenizer.eos_token_id
+    return eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
+
+
+def prepare_fixed_code_constraint(pipeline) -> None:
+    """Builds the token tables of `pipeline`'s model ahead of its first constrained generation."""
+    output_embeddings = pipeline.model.get_output_embeddings()
+    vocab_size = output_embeddings.weight.shape[0] if output_embeddings is not None else pipeline.model.config.vocab_size
+    _get_tables(pipeline.tokenizer, vocab_size, _eos_token_ids(pipeline))
+
+
+def fixed_code_logits_processor(pipeline, max_new_tokens: Optional[int] = None) -> FixedCodeLogitsProcessor:
+    """Logits processor constraining a transformers text-generation `pipeline` to the fix JSON schema."""
+    return FixedCodeLogitsProcessor(pipeline.tokenizer, _eos_token_ids(pipeline), max_new_tokens)
@@ -0,0 +1,323 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+
+from app.services.CpuInference import (
+    CPU_QUANTIZATION,
+    INFERENCE_DEVICE,
+    configure_threads,
+    cpu_load_kwargs,
+    process_rss_bytes,
+    quantize_for_cpu,
+)
+from app.services.SharedBase import SharedBase, adapter_base_model_id
+
+DEFAULT_FIX_MODEL_ID = "TheCasvi/Qwen3-4B-CodeMedic-adapter"
+# Distilled 1.7B adapter: faster, good enough for short snippets and syntax errors
+SMALL_FIX_MODEL_ID = "TheCasvi/Qwen3-1.7B-35KD-adapter"
+
+# Merged exports written by scripts/export_merged_model.py, loaded instead of base model + adapter
+MERGED_MODELS_DIR = os.getenv("CODEMEDIC_MERGED_MODELS_DIR", "")
+EXPORT_MANIFEST = "codemedic_export.json"
+
+DEFAULT_PIPELINE_KWARGS = {
+    "max_new_tokens": 1000,
+    "do_sample": False,
+    "repetition_penalty": 1.03,
+}
+
+# Decode full-code answers against the FixedCodeIssue JSON schema (local pipeline models only)
+CONSTRAINED_DECODING = os.getenv("CODEMEDIC_CONSTRAINED_DECODING", "1") == "1"
+
+# Adapters of the same base model share one copy of its weights
+SHARED_BASE_MODELS = os.getenv("CODEMEDIC_SHARED_BASE_MODELS", "1") == "1"
+# Fix models a request may ask for by id
+ALLOWED_FIX_MODEL_IDS = [
+    model_id.strip()
+    for model_id in os.getenv("CODEMEDIC_FIX_MODELS", f"{DEFAULT_FIX_MODEL_ID},{SMALL_FIX_MODEL_ID}").split(",")
+    if model_id.strip()
+]
+
+# What a loaded model occupies in the pool: ("model", model_id) or ("shared", base_model_id)
+WeightsKey = Tuple[str, str]
+
+
+class ModelRegistry:
+    """
+    Process-wide pool of loaded fix models.
+
+    Each model/adapter is loaded once per worker and shared by every request and
+    agent run. Adapters of the same base model are served from one SharedBase, so
+    each extra adapter only costs its LoRA weights. The pool is bounded by copies
+    of model weights (a shared base counts once, whatever its adapters): when it is
+    full, the least recently used models are evicted before new weights are loaded.
+    """
+
+    def __init__(self, capacity: int = 2):
+        self.capacity = max(1, capacity)
+        self._models: "OrderedDict[str, ChatHuggingFace]" = OrderedDict()
+        self._weights_keys: Dict[str, WeightsKey] = {}
+        self._shared_bases: Dict[str, SharedBase] = {}
+        self._adapter_names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+        self._load_seconds: Dict[str, float] = {}
+        self._load_sources: Dict[str, str] = {}
+        self._size_bytes: Dict[str, int] = {}
+        self._preload_seconds: Optional[float] = None
+
+    def get(self, model_id: str = DEFAULT_FIX_MODEL_ID) -> ChatHuggingFace:
+        """Returns the chat model for `model_id`, loading it on first use."""
+        with self._lock:
+            if model_id in self._models:
+                self._models.move_to_end(model_id)
+                self._hits += 1
+                return self._models[model_id]
+            load_lock = self._load_locks.setdefault(model_id, threading.Lock())
+
+        # Only one thread loads a given model; the others wait and reuse it
+        with load_lock:
+            with self._lock:
+                if model_id in self._models:
+                    self._models.move_to_end(model_id)
+                    self._hits += 1
+                    return self._models[model_id]
+
+            weights_key = self._weights_key(model_id)
+            with self._lock:
+                # Free a slot before loading so peak memory stays within capacity
+                while self._needs_slot(weights_key):
+                    self._evict_lru()
+
+            chat_model = self._load(model_id, weights_key)
+
+            with self._lock:
+                while self._needs_slot(weights_key):
+                    self._evict_lru()
+                self._models[model_id] = chat_model
+                self._weights_keys[model_id] = weights_key
+                return chat_model
+
+    def adapter_name(self, model_id: str) -> Optional[str]:
+        """PEFT adapter name of `model_id` if it is served from a shared base, else None."""
+        with self._lock:
+            return self._adapter_names.get(model_id)
+
+    def generation_lock(self, model_id: str):
+        """Lock to hold while generating with `model_id`: its shared base's, or a no-op for a standalone model."""
+        with self._lock:
+            kind, key = self._weights_keys.get(model_id, ("model", model_id))
+            shared_base = self._shared_bases.get(key) if kind == "shared" else None
+        return shared_base.generation_lock if shared_base is not None else nullcontext()
+
+    def batch_group(self, model_id: str) -> str:
+        """Requests for models of the same group can run in one batch: adapters of one shared base."""
+        with self._lock:
+            kind, key = self._weights_keys.get(model_id, ("model", model_id))
+            return f"{kind}:{key}"
+
+    def preload(self, model_ids: List[str]) -> None:
+        """Loads the given models ahead of the first request."""
+        started = time.perf_counter()
+        for model_id in model_ids:
+            self.get(model_id)
+        with self._lock:
+            self._preload_seconds = round(time.perf_counter() - started, 3)
+
+    def evict(self, model_id: str) -> bool:
+        """Drops `model_id` from the pool. Returns False if it was not loaded."""
+        with self._lock:
+            if model_id not in self._models:
+                return False
+            self._remove(model_id)
+        self._release_memory()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "loaded_models": list(self._models.keys()),
+                "shared_bases": {
+                    base_model_id: {"adapters": shared_base.adapters, "size_bytes": shared_base.base_bytes()}
+                    for base_model_id, shared_base in self._shared_bases.items()
+                },
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "device": INFERENCE_DEVICE,
+                "cpu_quantization": CPU_QUANTIZATION if INFERENCE_DEVICE == "cpu" else None,
+                "load_seconds": dict(self._load_seconds),
+                "load_sources": dict(self._load_sources),
+                "preload_seconds": self._preload_seconds,
+                "size_bytes": dict(self._size_bytes),
+                "total_size_bytes": sum(self._size_bytes.values()) + sum(
+                    shared_base.base_bytes() for shared_base in self._shared_bases.values()
+                ),
+                "process_rss_bytes": process_rss_bytes(),
+            }
+
+    def _weights_key(self, model_id: str) -> WeightsKey:
+        # Merged exports and quantized CPU weights cannot take extra adapters: they stay standalone
+        if not SHARED_BASE_MODELS or self._merged_path(model_id) or (INFERENCE_DEVICE == "cpu" and CPU_QUANTIZATION != "none"):
+            return "model", model_id
+        try:
+            base_model_id = adapter_base_model_id(model_id)
+        except Exception as e:
+            # Hub or network errors reading the adapter config: the standalone load may still work.
+            # Not cached by adapter_base_model_id, so the next load tries sharing again
+            print(f"⚠️ Could not read the adapter config of `{model_id}`, loading it standalone: {str(e)}")
+            return "model", model_id
+        return ("shared", base_model_id) if base_model_id else ("model", model_id)
+
+    def _needs_slot(self, weights_key: WeightsKey) -> bool:
+        # Caller must hold self._lock
+        resident: Set[WeightsKey] = set(self._weights_keys.values())
+        return weights_key not in resident and len(resident) >= self.capacity
+
+    def _load(self, model_id: str, weights_key: WeightsKey) -> ChatHuggingFace:
+        if weights_key[0] == "shared":
+            return self._load_adapter(model_id, weights_key[1])
+
+        # A merged export is a single memory-mapped safetensors checkpoint: no base + adapter merge at startup
+        merged_path = self._merged_path(model_id)
+        source = "merged" if merged_path else "adapter"
+        print(f"⏳ Loading model `{model_id}` ({source})...")
+        started = time.perf_counter()
+        load_kwargs = cpu_load_kwargs() if INFERENCE_DEVICE == "cpu" else {}
+        llm = HuggingFacePipeline.from_model_id(
+            model_id=merged_path or model_id,
+            task="text-generation",
+            pipeline_kwargs=dict(DEFAULT_PIPELINE_KWARGS),
+            **load_kwargs,
+        )
+        if INFERENCE_DEVICE == "cpu":
+            llm.pipeline.model = quantize_for_cpu(llm.pipeline.model.eval())
+        self._prepare_constraint(llm.pipeline)
+        chat_model = ChatHuggingFace(llm=llm, model_id=model_id)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._loads += 1
+            self._load_seconds[model_id] = round(elapsed, 3)
+            self._load_sources[model_id] = source
+            self._size_bytes[model_id] = self._memory_footprint(llm)
+        print(f"✅ Model `{model_id}` loaded in {elapsed:.1f}s")
+        return chat_model
+
+    def _load_adapter(self, model_id: str, base_model_id: str) -> ChatHuggingFace:
+        started = time.perf_counter()
+        with self._lock:
+            base_lock = self._load_locks.setdefault(f"shared:{base_model_id}", threading.Lock())
+        # Adapters of the same base may load concurrently; only one of them loads the base
+        with base_lock:
+            with self._lock:
+                shared_base = self._shared_bases.get(base_model_id)
+            if shared_base is None:
+                print(f"⏳ Loading shared base model `{base_model_id}`...")
+                load_kwargs = cpu_load_kwargs() if INFERENCE_DEVICE == "cpu" else {}
+                shared_base = SharedBase(base_model_id, DEFAULT_PIPELINE_KWARGS, load_kwargs)
+                # Adapters keep the base's vocabulary: its token tables serve all of them
+                self._prepare_constraint(shared_base.pipeline)
+                with self._lock:
+                    self._shared_bases[base_model_id] = shared_base
+
+        print(f"⏳ Attaching adapter `{model_id}` to `{base_model_id}`...")
+        name = shared_base.attach(model_id)
+        llm = HuggingFacePipeline(pipeline=shared_base.pipeline, model_id=model_id, pipeline_kwargs=dict(DEFAULT_PIPELINE_KWARGS))
+        chat_model = ChatHuggingFace(llm=llm, model_id=model_id, tokenizer=shared_base.pipeline.tokenizer)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._loads += 1
+            self._load_seconds[model_id] = round(elapsed, 3)
+            self._load_sources[model_id] = "shared base"
+            self._size_bytes[model_id] = shared_base.adapter_bytes(model_id)
+            self._adapter_names[model_id] = name
+            # Re-register in case the base was released while this adapter was loading
+            self._shared_bases.setdefault(base_model_id, shared_base)
+        print(f"✅ Adapter `{model_id}` ready in {elapsed:.1f}s")
+        return chat_model
+
+    def _merged_path(self, model_id: str) -> Optional[str]:
+        merged_path = merged_model_dir(MERGED_MODELS_DIR, model_id) if MERGED_MODELS_DIR else None
+        return merged_path if merged_path and os.path.isfile(os.path.join(merged_path, EXPORT_MANIFEST)) else None
+
+    def _remove(self, model_id: str) -> None:
+        # Caller must hold self._lock
+        del self._models[model_id]
+        self._size_bytes.pop(model_id, None)
+        self._adapter_names.pop(model_id, None)
+        kind, key = self._weights_keys.pop(model_id)
+        self._evictions += 1
+        # Adapters stay attached to their base (in-flight batches may still use them) until the
+        # last model using the base leaves the pool, then the whole base is released
+        if kind == "shared" and ("shared", key) not in self._weights_keys.values():
+            self._shared_bases.pop(key, None)
+            print(f"♻️ Released shared base model `{key}`")
+
+    def _evict_lru(self) -> None:
+        # Caller must hold self._lock
+        model_id = next(iter(self._models))
+        self._remove(model_id)
+        print(f"♻️ Evicted model `{model_id}` from the pool")
+        self._release_memory()
+
+    @staticmethod
+    def _prepare_constraint(pipeline) -> None:
+        # Decoding the whole vocabulary takes seconds: done here rather than on the first constrained fix
+        if not CONSTRAINED_DECODING:
+            return
+        from app.services.JsonConstraint import prepare_fixed_code_constraint
+        started = time.perf_counter()
+        prepare_fixed_code_constraint(pipeline)
+        print(f"🧩 JSON constraint tables ready in {time.perf_counter() - started:.1f}s")
+
+    @staticmethod
+    def _memory_footprint(llm: HuggingFacePipeline) -> int:
+        try:
+            return int(llm.pipeline.model.get_memory_footprint())
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _release_memory() -> None:
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+def merged_model_dir(root: str, model_id: str) -> str:
+    """Where the merged export of `model_id` lives under `root`."""
+    return os.path.join(root, model_id.replace("/", "__"))
+
+
+def _preload_model_ids() -> List[str]:
+    raw = os.getenv("CODEMEDIC_PRELOAD_MODELS", "")
+    return [model_id.strip() for model_id in raw.split(",") if model_id.strip()]
+
+
+def preload_models_from_env() -> None:
+    """Preloads the models listed in CODEMEDIC_PRELOAD_MODELS (comma separated)."""
+    model_ids = _preload_model_ids()
+    if model_ids:
+        model_registry.preload(model_ids)
+
+
+if INFERENCE_DEVICE == "cpu":
+    print(f"🖥️ CPU inference with {configure_threads()} threads, {CPU_QUANTIZATION} weights")
+
+model_registry = ModelRegistry(capacity=int(os.getenv("CODEMEDIC_MODEL_POOL_SIZE", "2")))
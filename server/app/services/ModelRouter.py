@@ -0,0 +1,107 @@
+import ast
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from app.services.ModelRegistry import DEFAULT_FIX_MODEL_ID, SMALL_FIX_MODEL_ID
+
+# Snippets up to this size go to the small model first
+SMALL_MODEL_MAX_LINES = 60
+SMALL_MODEL_MAX_DEFINITIONS = 2
+# A syntax error is a local fix even in a somewhat larger snippet
+SMALL_MODEL_MAX_LINES_SYNTAX_ERROR = 150
+
+
+def has_syntax_error(code: str) -> bool:
+    try:
+        compile(code, "<snippet>", "exec")
+        return False
+    except (SyntaxError, ValueError):
+        return True
+
+
+class ModelRouter:
+    """
+    Chooses between the small (1.7B) and the large (4B) fix adapter per snippet.
+
+    Short snippets and syntax errors caught by `compile()` go to the small model;
+    the large one handles everything else and any small-model answer that fails
+    validation. Decisions, escalations and per-model latency are recorded so the
+    quality/latency trade-off can be tuned with data.
+    """
+
+    def __init__(self, small_model_id: str, large_model_id: str, enabled: bool = True):
+        self.small_model_id = small_model_id
+        self.large_model_id = large_model_id
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._decisions: Dict[str, int] = {}
+        self._escalations: Dict[str, int] = {}
+        self._latencies: Dict[str, List[Tuple[float, bool]]] = {}
+
+    def route(self, buggy_code: str) -> Tuple[str, str]:
+        """Returns (model_id, reason) for `buggy_code`."""
+        model_id, reason = self._route(buggy_code)
+        with self._lock:
+            self._decisions[reason] = self._decisions.get(reason, 0) + 1
+        print(f"🧭 Routing fix to `{model_id}` ({reason})")
+        return model_id, reason
+
+    def accepts(self, buggy_code: str, fixed_code: str) -> bool:
+        """Validation of a small-model answer: it must change the code and, for a syntax error, compile."""
+        if fixed_code.strip() == buggy_code.strip():
+            return False
+        return not (has_syntax_error(buggy_code) and has_syntax_error(fixed_code))
+
+    def record(self, model_id: str, latency_seconds: float, succeeded: bool) -> None:
+        with self._lock:
+            self._latencies.setdefault(model_id, []).append((latency_seconds, succeeded))
+            del self._latencies[model_id][:-1000]
+
+    def record_escalation(self, reason: str) -> None:
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "small_model": self.small_model_id,
+                "large_model": self.large_model_id,
+                "decisions": dict(self._decisions),
+                "escalations": dict(self._escalations),
+                "models": {model_id: self._summarize(calls) for model_id, calls in self._latencies.items()},
+            }
+
+    def _route(self, buggy_code: str) -> Tuple[str, str]:
+        if not self.enabled:
+            return self.large_model_id, "routing disabled"
+        line_count = len([line for line in buggy_code.splitlines() if line.strip()])
+        if has_syntax_error(buggy_code):
+            if line_count <= SMALL_MODEL_MAX_LINES_SYNTAX_ERROR:
+                return self.small_model_id, "syntax error"
+            return self.large_model_id, "syntax error in a large snippet"
+        definitions = sum(
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            for node in ast.walk(ast.parse(buggy_code))
+        )
+        if line_count <= SMALL_MODEL_MAX_LINES and definitions <= SMALL_MODEL_MAX_DEFINITIONS:
+            return self.small_model_id, "small snippet"
+        return self.large_model_id, "complex snippet"
+
+    @staticmethod
+    def _summarize(calls: List[Tuple[float, bool]]) -> dict:
+        latencies = sorted(latency for latency, _ in calls)
+        return {
+            "calls": len(calls),
+            "latency_p50_seconds": round(latencies[len(latencies) // 2], 3),
+            "latency_p95_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "success_rate": round(sum(1 for _, succeeded in calls if succeeded) / len(calls), 3),
+        }
+
+
+model_router = ModelRouter(
+    small_model_id=os.getenv("CODEMEDIC_SMALL_FIX_MODEL", SMALL_FIX_MODEL_ID),
+    large_model_id=os.getenv("CODEMEDIC_LARGE_FIX_MODEL", DEFAULT_FIX_MODEL_ID),
+    enabled=os.getenv("CODEMEDIC_MODEL_ROUTING", "1") == "1",
+)
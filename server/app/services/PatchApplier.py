@@ -0,0 +1,130 @@
+import difflib
+import re
+from typing import List, Optional, Tuple
+
+# `@@ -12,7 +12,7 @@`; models often drop the counts or the numbers altogether
+_HUNK_HEADER_RE = re.compile(r"^@@\s*(?:-(?P<old_start>\d+)(?:,(?P<old_count>\d+))?\s+\+\d+(?:,\d+)?)?\s*@@")
+_THINK_BLOCK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+_DIFF_FENCE_RE = re.compile(r"```(?:diff|patch)?[ \t]*\n(?P<diff>.*?)```", re.DOTALL)
+
+# Minimum similarity for a hunk to apply to lines that differ from its context
+FUZZY_MATCH_RATIO = 0.8
+
+
+class _Hunk:
+    def __init__(self, old_start: Optional[int], old_count: Optional[int] = None):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.lines: List[Tuple[str, str]] = []
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for op, text in self.lines if op != "+"]
+
+
+def extract_unified_diff(text: str) -> Optional[str]:
+    """Returns the unified diff in a model response (fenced or bare), or None."""
+    text = _THINK_BLOCK_RE.sub("", text)
+    fenced = _DIFF_FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group("diff")
+    start = next((match.start() for match in re.finditer(r"^(?:---|@@)", text, re.MULTILINE)), None)
+    return text[start:] if start is not None else None
+
+
+def parse_unified_diff(diff_text: str) -> List[_Hunk]:
+    hunks: List[_Hunk] = []
+    for line in diff_text.splitlines():
+        header = _HUNK_HEADER_RE.match(line)
+        if header:
+            old_start, old_count = header.group("old_start"), header.group("old_count")
+            hunks.append(_Hunk(int(old_start) if old_start else None, int(old_count) if old_count else None))
+        elif not hunks or line.startswith(("---", "+++", "\\")):
+            # File headers, "\ No newline at end of file", text before the first hunk
+            continue
+        elif line.startswith(("+", "-", " ")):
+            hunks[-1].lines.append((line[0], line[1:]))
+        else:
+            # Models often drop the leading space of context lines (blank ones above all)
+            hunks[-1].lines.append((" ", line))
+    # Trailing blank context lines are usually just the end of the response
+    for hunk in hunks:
+        while hunk.lines and hunk.lines[-1] == (" ", ""):
+            hunk.lines.pop()
+    return [hunk for hunk in hunks if any(op != " " for op, _ in hunk.lines)]
+
+
+def apply_unified_diff(source: str, diff_text: str) -> Optional[str]:
+    """
+    Applies a unified diff to `source`, tolerating the usual model mistakes: wrong
+    or missing line numbers, re-indented or slightly altered context lines. Each
+    hunk is matched exactly near its stated line first, then anywhere after the
+    previous hunk ignoring whitespace, then by similarity. Returns None if the diff
+    has no hunks or any hunk cannot be placed.
+    """
+    hunks = parse_unified_diff(diff_text)
+    if not hunks:
+        return None
+
+    lines = source.splitlines()
+    trailing_newline = source.endswith("\n")
+    newline = "\r\n" if "\r\n" in source else "\n"
+    search_from = 0
+    offset = 0
+    for hunk in hunks:
+        old_lines = hunk.old_lines
+        if hunk.old_start is None:
+            expected = search_from
+        elif hunk.old_count == 0:
+            # Empty old range: `-N,0` means insert after line N
+            expected = hunk.old_start + offset
+        else:
+            expected = max(0, hunk.old_start - 1 + offset)
+        position = _locate_hunk(lines, old_lines, max(expected, search_from), search_from)
+        if position is None and search_from:
+            # Models sometimes emit hunks out of order
+            position = _locate_hunk(lines, old_lines, expected, 0)
+        if position is None:
+            return None
+
+        replacement = []
+        cursor = position
+        for op, text in hunk.lines:
+            if op == "+":
+                replacement.append(text)
+            elif op == " ":
+                # Keep the file's own version of context lines
+                replacement.append(lines[cursor])
+                cursor += 1
+            else:
+                cursor += 1
+        lines[position:position + len(old_lines)] = replacement
+        search_from = position + len(replacement)
+        offset += len(replacement) - len(old_lines)
+
+    patched = newline.join(lines)
+    return patched + newline if trailing_newline and lines else patched
+
+
+def _locate_hunk(lines: List[str], old_lines: List[str], expected: int, search_from: int) -> Optional[int]:
+    if not old_lines:
+        # Pure insertion: trust the stated position
+        return min(expected, len(lines))
+    positions = range(search_from, len(lines) - len(old_lines) + 1)
+    # Prefer matches closest to where the hunk says it belongs
+    ordered = sorted(positions, key=lambda position: abs(position - expected))
+
+    for normalize in (lambda text: text, lambda text: text.strip()):
+        wanted = [normalize(text) for text in old_lines]
+        for position in ordered:
+            if [normalize(text) for text in lines[position:position + len(old_lines)]] == wanted:
+                return position
+
+    wanted_text = "\n".join(text.strip() for text in old_lines)
+    best_position, best_ratio = None, FUZZY_MATCH_RATIO
+    for position in ordered:
+        candidate_text = "\n".join(text.strip() for text in lines[position:position + len(old_lines)])
+        ratio = difflib.SequenceMatcher(None, wanted_text, candidate_text).ratio()
+        if ratio > best_ratio:
+            best_position, best_ratio = position, ratio
+    return best_position
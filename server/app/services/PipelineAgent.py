@@ -0,0 +1,154 @@
+import time
+from typing import List, Optional
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from app.models.models import GitHubIssue, FinalAgentOutput, LocalizedFile, RepositoryTree
+from app.services.CodeFixer import generate_fixed_code, generate_region_fix, extract_json_object
+from app.services.GitHubGateway import github_gateway
+from app.services.IssueLocalizer import IssueLocalizer
+from app.services.ReactAgent import ReactAgent
+from app.services.RunMetrics import LlmCallCounter, run_metrics
+from app.services.SnapshotCache import snapshot_cache
+from app.services.tools.tools import publish_fix
+
+# Upper bound of files the pipeline will fix for a single issue
+MAX_FILES_PER_ISSUE = 3
+
+
+class PipelineFailure(Exception):
+    pass
+
+
+class PipelineAgent(ReactAgent):
+    """
+    Deterministic execution mode for the fixed fix-and-PR workflow.
+
+    Code drives the list → read → fix → branch → commit → PR sequence directly;
+    the LLM is only used to localize the affected file(s) and to produce the fix,
+    instead of spending one LLM round trip deciding every step.
+    """
+
+    def run(self, github_issue: GitHubIssue, callbacks=None):
+        started = time.perf_counter()
+        self._messages: List[str] = []
+        self._tool_path: List[str] = []
+        # Same counting as react mode: LLM calls through callbacks, fix model calls reported by CodeFixer
+        llm_call_counter = LlmCallCounter()
+        self._config = {"callbacks": [llm_call_counter, *(callbacks or [])]}
+        token = self.github_credentials.token
+        repository = self.github_credentials.repository_name
+
+        with llm_call_counter.counting():
+            try:
+                repo = github_gateway.repo(token, repository)
+                base_branch = repo.default_branch
+
+                tree = self._step("get_repository_file_names", lambda: snapshot_cache.get_tree(repo, base_branch))
+                candidates = self._localize(github_issue, tree)
+                self._log(f"📍 Localized files: {', '.join(candidate.path for candidate in candidates)}")
+
+                fixes = {}
+                for candidate in candidates:
+                    file_path = candidate.path
+                    _, content = self._step("get_repository_file_content", lambda: snapshot_cache.get_file(repo, file_path, base_branch))
+                    if content is None:
+                        raise PipelineFailure(f"`{file_path}` could not be read")
+                    fixed_code = self._fix(content.decode("utf-8"), candidate)
+                    if fixed_code is None:
+                        self._log(f"⚠️ The fix model returned no usable fix for `{file_path}`")
+                        continue
+                    fixes[file_path] = fixed_code
+
+                if not fixes:
+                    raise PipelineFailure("The fix model did not produce a fix for any localized file")
+
+                # Branch, one commit with every fixed file and the PR; a rerun reuses the branch and PR
+                summary = self._call_tool(publish_fix, {
+                    "github_token": token,
+                    "repository": repository,
+                    "branch": f"codemedic/issue-{github_issue.number}",
+                    "files": [{"file_path": file_path, "content": fixed_code} for file_path, fixed_code in fixes.items()],
+                    "commit_message": f"Fix #{github_issue.number}: {', '.join(fixes)}",
+                    "pr_title": f"Fix #{github_issue.number}: {github_issue.title}",
+                    "pr_body": f"Automated fix generated by CodeMedic.\n\nCloses #{github_issue.number}",
+                    "base_branch": base_branch,
+                })
+            except PipelineFailure as e:
+                summary = f"❌ Pipeline stopped: {str(e)}"
+                self._log(summary)
+
+        latency_seconds = round(time.perf_counter() - started, 3)
+        run_metrics.record("pipeline", latency_seconds, llm_call_counter.count)
+        print(f"\n🔧 Tools used in this execution: {self._tool_path}")
+        return FinalAgentOutput(
+            messages=self._messages,
+            summary=summary,
+            tool_path=self._tool_path,
+            mode="pipeline",
+            llm_calls=llm_call_counter.count,
+            latency_seconds=latency_seconds,
+        )
+
+    def _localize(self, github_issue: GitHubIssue, tree: RepositoryTree) -> List[LocalizedFile]:
+        """
+        Tracebacks, paths and file names in the issue usually pin the file down without
+        the LLM; otherwise LLM call (a) picks the file(s) from the repository listing.
+        """
+        known_paths = set(tree.file_paths())
+        candidates = IssueLocalizer(tree.file_paths()).localize(f"{github_issue.title}\n{github_issue.body}")
+        if candidates:
+            # Keep only the candidates that score close to the best one
+            best_score = candidates[0].score
+            return [candidate for candidate in candidates if candidate.score >= best_score / 2][:MAX_FILES_PER_ISSUE]
+
+        listing = "\n".join(sorted(known_paths))
+        response = self._build_llm().invoke([
+            SystemMessage(content="You locate the source files a GitHub issue is about."),
+            HumanMessage(content=f"""ISSUE:
+{github_issue.title}
+
+{github_issue.body}
+
+REPOSITORY FILES:
+{listing}
+
+Respond only with JSON using this format, choosing paths from the list above (most relevant first):
+{{ "files": ["path/to/file.py"] }}"""),
+        ], config=self._config)
+        parsed = extract_json_object(str(response.content)) or {}
+        candidates = parsed.get("files") if isinstance(parsed.get("files"), list) else []
+        file_paths = [path.strip("/") for path in candidates if isinstance(path, str) and path.strip("/") in known_paths]
+        if not file_paths:
+            raise PipelineFailure("Could not localize the affected file(s)")
+        return [LocalizedFile(path=path, score=0.0, reasons=["picked by the LLM"]) for path in file_paths[:MAX_FILES_PER_ISSUE]]
+
+    def _fix(self, buggy_code: str, candidate: LocalizedFile) -> Optional[str]:
+        """
+        LLM call (b): produce the corrected code. When the issue reported a line, only the
+        enclosing function/class is sent to the fix model; the whole file is the fallback.
+        """
+        if candidate.line is not None:
+            fixed_code, _ = self._step("fix_code_region", lambda: generate_region_fix(buggy_code, candidate.line, file_path=candidate.path))
+            if fixed_code is not None:
+                return fixed_code
+            self._log(f"⚠️ Region fix of `{candidate.path}` failed, fixing the whole file")
+        fixed_code, _ = self._step("fix_code_issues", lambda: generate_fixed_code(buggy_code))
+        return fixed_code
+
+    def _call_tool(self, tool, args: dict) -> str:
+        result = self._step(tool.name, lambda: tool.invoke(args, config=self._config))
+        self._log(result)
+        if result.startswith(("❌", "⚠️")):
+            raise PipelineFailure(result)
+        return result
+
+    def _step(self, tool_name: str, action):
+        if tool_name not in self._tool_path:
+            self._tool_path.append(tool_name)
+        print(f"🔧 Pipeline step: {tool_name}")
+        return action()
+
+    def _log(self, message: str) -> None:
+        print(message)
+        self._messages.append(message)
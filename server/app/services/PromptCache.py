@@ -0,0 +1,95 @@
+import copy
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+# Shorter shared prefixes are not worth a separate forward pass
+MIN_PREFIX_TOKENS = 16
+
+
+class _PrefixEntry:
+    def __init__(self, token_ids: List[int], cache):
+        self.token_ids = token_ids
+        self.cache = cache
+
+
+class PromptCache:
+    """
+    Reuses the KV cache of the prompt prefix shared by consecutive fix requests.
+
+    Fix prompts start with the same system prompt and instructions and only differ
+    in the code, so the prefix's keys and values are computed once per model and a
+    copy seeds every later generation, which then only prefills the code. The
+    shared prefix is learned as the longest common token prefix of consecutive
+    prompts, so it also adapts to the diff and region-context prompt variants.
+    Entries are tied to the model object (and adapter, on a shared base model)
+    and go away when the model is evicted.
+    """
+
+    def __init__(self):
+        self._entries: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._last_prompts: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "prefix_builds": 0, "reused_tokens": 0}
+
+    def past_key_values(self, model, token_ids: List[int], adapter_name: Optional[str] = None) -> Optional[object]:
+        """A private copy of the cached KV for the prefix of `token_ids`, or None if there is none yet."""
+        with self._lock:
+            # Each adapter computes different keys and values for the same prefix
+            entry: Optional[_PrefixEntry] = self._entries.setdefault(model, {}).get(adapter_name)
+            last_prompts: Dict[Optional[str], List[int]] = self._last_prompts.setdefault(model, {})
+            last_prompt = last_prompts.get(adapter_name, [])
+            last_prompts[adapter_name] = token_ids
+
+        if entry is None or not self._extends(token_ids, entry.token_ids):
+            # At least one token must be left for generate to prefill
+            prefix_length = min(self._common_prefix_length(token_ids, last_prompt), len(token_ids) - 1)
+            if prefix_length < MIN_PREFIX_TOKENS:
+                with self._lock:
+                    self._counters["misses"] += 1
+                return None
+            entry = _PrefixEntry(token_ids[:prefix_length], self._prefill(model, token_ids[:prefix_length], adapter_name))
+            with self._lock:
+                self._entries[model][adapter_name] = entry
+                self._counters["prefix_builds"] += 1
+
+        with self._lock:
+            self._counters["hits"] += 1
+            self._counters["reused_tokens"] += len(entry.token_ids)
+        # generate() appends to the cache it is given, so every request gets its own copy
+        return copy.deepcopy(entry.cache)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "prefix_tokens": {
+                    adapter_name or getattr(model, "name_or_path", type(model).__name__): len(entry.token_ids)
+                    for model, entries in self._entries.items()
+                    for adapter_name, entry in entries.items()
+                },
+            }
+
+    @staticmethod
+    def _prefill(model, token_ids: List[int], adapter_name: Optional[str]):
+        import torch
+        from transformers import DynamicCache
+
+        cache = DynamicCache()
+        adapter_kwargs = {"adapter_names": [adapter_name]} if adapter_name else {}
+        with torch.no_grad():
+            model(input_ids=torch.tensor([token_ids], device=model.device), past_key_values=cache, use_cache=True, **adapter_kwargs)
+        return cache
+
+    @staticmethod
+    def _extends(token_ids: List[int], prefix: List[int]) -> bool:
+        return len(token_ids) > len(prefix) and token_ids[:len(prefix)] == prefix
+
+    @staticmethod
+    def _common_prefix_length(a: List[int], b: List[int]) -> int:
+        length = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            length += 1
+        return length
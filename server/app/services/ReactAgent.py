@@ -2,22 +2,37 @@
 from langchain_huggingface import HuggingFaceEndpoint, HuggingFacePipeline, ChatHuggingFace
 from langgraph.prebuilt import create_react_agent
 from dotenv import load_dotenv, find_dotenv
+import asyncio
 import os
 import functools
+import time
+from typing import AsyncIterator, List, Optional
 
-from app.models.models import GitHubIssue, GitHubCredentials,  FinalAgentOutput
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, ToolMessage
+
+from app.models.models import GitHubIssue, GitHubCredentials,  FinalAgentOutput, LocalizedFile
+from app.services.IssueLocalizer import localize_issue, format_candidates
+from app.services.RunMetrics import LlmCallCounter, run_metrics
 # Import tools directly first to test
 from app.services.tools.tools import (
     get_repository_file_names, 
     get_repository_file_content, 
+    find_symbol_definition,
     fix_code_issues,
+    fix_code_region,
     create_branch, 
     update_file_in_branch, 
-    create_pull_request
+    commit_files_to_branch,
+    create_pull_request,
+    publish_fix
 )
 
 tool_path_log = []
 
+# Tool results can be whole files; streamed events only carry a preview
+TOOL_RESULT_PREVIEW_CHARS = 2000
+
 # Decorator to log tool usage
 def log_tool_call(tool_func):
     @functools.wraps(tool_func)  # This preserves the original function's metadata
@@ -64,20 +79,113 @@ class ReactAgent:
         
         raise ValueError("HuggingFace token not found in environment variables. Please check your .env file.")
 
-    def run(self, github_issue: GitHubIssue):
+    def run(self, github_issue: GitHubIssue, callbacks: Optional[List[BaseCallbackHandler]] = None):
         # Clear the tool log for this run
         global tool_path_log
         tool_path_log = []
 
+        started = time.perf_counter()
+        llm_call_counter = LlmCallCounter()
+        agent_graph = self._build_agent_graph()
+        candidates = localize_issue(self.github_credentials, github_issue)
+        inputs = {"messages": [("user", self._build_user_message(github_issue, candidates))]}
+        config = self._build_config(github_issue, [llm_call_counter, *(callbacks or [])])
+
+        # Run the agent and print messages
+        with llm_call_counter.counting():
+            result = agent_graph.invoke(inputs, config=config)
+        latency_seconds = round(time.perf_counter() - started, 3)
+        run_metrics.record("react", latency_seconds, llm_call_counter.count)
+        formatted_messages = [msg.content for msg in result["messages"]]
+        
+        # Extract tool usage from agent messages
+        used_tools = self._extract_tools_from_messages(result["messages"])
+        
+        # Create output with extracted tool usage
+        output = FinalAgentOutput(
+            messages=formatted_messages,
+            summary=formatted_messages[-1] if formatted_messages else "No response generated",
+            tool_path=used_tools,
+            mode="react",
+            llm_calls=llm_call_counter.count,
+            latency_seconds=latency_seconds
+        )
+        
+        print(f"\n🔧 Tools used in this execution: {used_tools}")
+        return output
+
+    async def astream(self, github_issue: GitHubIssue) -> AsyncIterator[dict]:
+        """
+        Streams the agent run as events while it happens: every tool call, tool
+        result (truncated) and model message, ending with a `summary` event.
+        Messages are not accumulated, only the last model message is kept.
+        """
+        started = time.perf_counter()
+        llm_call_counter = LlmCallCounter()
+        # Both block on network I/O (model resolution, GitHub reads): keep them off the event loop
+        agent_graph = await asyncio.to_thread(self._build_agent_graph)
+        candidates = await asyncio.to_thread(localize_issue, self.github_credentials, github_issue)
+        if candidates:
+            yield {"event": "localization", "data": {"candidates": [candidate.model_dump() for candidate in candidates]}}
+        inputs = {"messages": [("user", self._build_user_message(github_issue, candidates))]}
+        config = self._build_config(github_issue, [llm_call_counter])
+
+        used_tools = []
+        last_content = None
+        with llm_call_counter.counting():
+            async for update in agent_graph.astream(inputs, config=config, stream_mode="updates"):
+                for node_update in update.values():
+                    for message in (node_update or {}).get("messages", []):
+                        if isinstance(message, AIMessage):
+                            if message.content:
+                                last_content = str(message.content)
+                                yield {"event": "message", "data": {"content": last_content}}
+                            for tool_call in message.tool_calls:
+                                if tool_call["name"] not in used_tools:
+                                    used_tools.append(tool_call["name"])
+                                yield {"event": "tool_call", "data": {"name": tool_call["name"], "args": tool_call["args"]}}
+                        elif isinstance(message, ToolMessage):
+                            content = str(message.content)
+                            yield {
+                                "event": "tool_result",
+                                "data": {
+                                    "name": message.name,
+                                    "content": content[:TOOL_RESULT_PREVIEW_CHARS],
+                                    "truncated": len(content) > TOOL_RESULT_PREVIEW_CHARS,
+                                },
+                            }
+        latency_seconds = round(time.perf_counter() - started, 3)
+        run_metrics.record("react", latency_seconds, llm_call_counter.count)
+
+        print(f"\n🔧 Tools used in this execution: {used_tools}")
+        yield {
+            "event": "summary",
+            "data": {
+                "summary": last_content or "No response generated",
+                "tool_path": used_tools,
+                "llm_calls": llm_call_counter.count,
+                "latency_seconds": latency_seconds,
+            },
+        }
+
+    def _build_agent_graph(self):
         # Use original tools without modification for now
         tools = [
             get_repository_file_names,
             get_repository_file_content,
+            find_symbol_definition,
             fix_code_issues,
+            fix_code_region,
             create_branch,
             update_file_in_branch,
-            create_pull_request
+            commit_files_to_branch,
+            create_pull_request,
+            publish_fix
         ]
+        agent_graph = create_react_agent(model=self._build_llm(), tools=tools)
+        return agent_graph
+
+    def _build_llm(self) -> ChatHuggingFace:
         # Create base LLM with authentication
         base_llm = HuggingFaceEndpoint(
             model="Qwen/Qwen3-4B",
@@ -90,12 +198,16 @@ class ReactAgent:
         )
         
         # Wrap it with ChatHuggingFace for tool support
-        llm = ChatHuggingFace(llm=base_llm)
-
-        agent_graph = create_react_agent(model=llm, tools=tools)
+        return ChatHuggingFace(llm=base_llm)
 
-        # Build messages input
-        user_message = f"""You are a GitHub issue assistant specialized in fixing code problems. Your task is to analyze and fix the following GitHub issue.
+    def _build_user_message(self, github_issue: GitHubIssue, candidates: Optional[List[LocalizedFile]] = None) -> str:
+        if candidates:
+            # Files pinned down from tracebacks/paths in the issue: no full listing needed
+            first_step = f"""1. The issue points at these files (most likely first), start from them and only use get_repository_file_names if none of them is relevant:
+{format_candidates(candidates)}"""
+        else:
+            first_step = "1. First, examine the repository structure using get_repository_file_names"
+        return f"""You are a GitHub issue assistant specialized in fixing code problems. Your task is to analyze and fix the following GitHub issue.
 
 ISSUE DETAILS:
 {github_issue.model_dump_json(indent=2)}
@@ -104,53 +216,42 @@ GITHUB CREDENTIALS:
 {self.github_credentials.model_dump_json(indent=2)}
 
 MANDATORY INSTRUCTIONS (FOLLOW EXACTLY):
-1. First, examine the repository structure using get_repository_file_names
+{first_step}
 2. Analyze the issue description and identify the problematic file(s)
-3. Use get_repository_file_content to read the file(s) that contain the issue
-4. **MANDATORY**: Once you identify buggy code, you MUST use fix_code_issues tool to fix the code problems
-5. Create a new branch using create_branch with a descriptive name
-6. Update the fixed code in the branch using update_file_in_branch with the corrected code from fix_code_issues
-7. Create a pull request using create_pull_request with the fix
+3. Use get_repository_file_content to read the file(s) that contain the issue (if the issue names a function or class, find_symbol_definition gives you its exact file and lines)
+4. **MANDATORY**: Once you identify buggy code, you MUST use fix_code_issues tool to fix the code problems (if you know the buggy line or function, use fix_code_region on the file instead: it returns the whole corrected file)
+5. Publish the fix with ONE publish_fix call: pass a descriptive branch name, every fixed file with the corrected code from fix_code_issues or fix_code_region, a commit message and the pull request title and body. It creates the branch, commits the files and opens the pull request (do not call create_branch, update_file_in_branch or create_pull_request yourself)
 
 CRITICAL REQUIREMENTS:
 - You MUST use fix_code_issues tool for any code that has syntax errors, logical errors, or bugs
-- Do NOT manually fix code - always use the fix_code_issues tool first
+- Do NOT manually fix code - always use the fix_code_issues (or fix_code_region) tool first
 - The fix_code_issues tool will analyze and return the corrected code
 - Only proceed with file updates after getting the fixed code from fix_code_issues tool
 
 Focus only on the GitHub issue provided. Always use the fix_code_issues tool when dealing with code problems."""
-        inputs = {"messages": [("user", user_message)]}
 
+    def _build_config(self, github_issue: GitHubIssue, callbacks: Optional[List[BaseCallbackHandler]] = None) -> dict:
         # Configure with a thread id
         config = {"configurable": {"thread_id": f"issue-{github_issue.number}"}}
+        if callbacks:
+            # e.g. job progress reporting; they also see the nested tool and LLM calls
+            config["callbacks"] = callbacks
+        return config
 
-        # Run the agent and print messages
-        result = agent_graph.invoke(inputs, config=config)
-        formatted_messages = [msg.content for msg in result["messages"]]
-        
-        # Extract tool usage from agent messages
-        used_tools = self._extract_tools_from_messages(result["messages"])
-        
-        # Create output with extracted tool usage
-        output = FinalAgentOutput(
-            messages=formatted_messages,
-            summary=formatted_messages[-1] if formatted_messages else "No response generated",
-            tool_path=used_tools
-        )
-        
-        print(f"\n🔧 Tools used in this execution: {used_tools}")
-        return output
-    
     def _extract_tools_from_messages(self, messages):
         """Extract tool usage from agent messages"""
         used_tools = []
         tool_names = [
             "get_repository_file_names",
             "get_repository_file_content", 
+            "find_symbol_definition",
             "fix_code_issues",
+            "fix_code_region",
             "create_branch",
             "update_file_in_branch", 
-            "create_pull_request"
+            "commit_files_to_branch",
+            "create_pull_request",
+            "publish_fix"
         ]
         
         for message in messages:
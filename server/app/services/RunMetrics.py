@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class LlmCallCounter(BaseCallbackHandler):
+    """
+    Counts LLM invocations of an agent run. LangChain model calls are seen through
+    callbacks; fix model calls run on the inference scheduler, outside LangChain,
+    and are reported by CodeFixer to the counter made active with `counting()`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.fix_calls = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def counting(self) -> Iterator["LlmCallCounter"]:
+        """Fix model calls made inside the block (tools included) are added to this counter."""
+        token = _active_llm_call_counter.set(self)
+        try:
+            yield self
+        finally:
+            _active_llm_call_counter.reset(token)
+
+    def add_fix_calls(self, calls: int) -> None:
+        with self._lock:
+            self.count += calls
+            self.fix_calls += calls
+
+    def on_chat_model_start(self, serialized: dict, messages: List[Any], **kwargs: Any) -> None:
+        with self._lock:
+            self.count += 1
+
+    def on_llm_start(self, serialized: dict, prompts: List[str], **kwargs: Any) -> None:
+        with self._lock:
+            self.count += 1
+
+
+_active_llm_call_counter: ContextVar[Optional[LlmCallCounter]] = ContextVar("llm_call_counter", default=None)
+
+
+def count_fix_llm_calls(calls: int) -> None:
+    """Reports fix model calls to the LLM call counter of the current run, if any."""
+    counter = _active_llm_call_counter.get()
+    if counter is not None and calls:
+        counter.add_fix_calls(calls)
+
+
+class RunMetrics:
+    """Latency and LLM-call counts per execution mode, to compare react and pipeline runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[str, List[tuple]] = {}
+
+    def record(self, mode: str, latency_seconds: float, llm_calls: int) -> None:
+        with self._lock:
+            self._runs.setdefault(mode, []).append((latency_seconds, llm_calls))
+            # Keep a bounded window of recent runs per mode
+            del self._runs[mode][:-1000]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {mode: self._summarize(runs) for mode, runs in self._runs.items()}
+
+    @staticmethod
+    def _summarize(runs: List[tuple]) -> dict:
+        latencies = sorted(latency for latency, _ in runs)
+        return {
+            "runs": len(runs),
+            "latency_p50_seconds": round(latencies[len(latencies) // 2], 3),
+            "latency_p95_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "avg_llm_calls": round(sum(llm_calls for _, llm_calls in runs) / len(runs), 2),
+        }
+
+
+class FixMetrics:
+    """
+    Latency, output size and success rate of fix model calls per output format, plus
+    how often the agent asks to fix the same code again (a retry after a bad answer).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, List[tuple]] = {}
+        self._recent_requests: "OrderedDict[str, None]" = OrderedDict()
+        self._requests = 0
+        self._retries = 0
+
+    def record(self, output_format: str, latency_seconds: float, output_chars: int, succeeded: bool) -> None:
+        with self._lock:
+            self._calls.setdefault(output_format, []).append((latency_seconds, output_chars, succeeded))
+            del self._calls[output_format][:-1000]
+
+    def record_request(self, buggy_code: str) -> None:
+        digest = hashlib.sha1(buggy_code.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._requests += 1
+            if digest in self._recent_requests:
+                self._retries += 1
+                self._recent_requests.move_to_end(digest)
+            else:
+                self._recent_requests[digest] = None
+                while len(self._recent_requests) > 1000:
+                    self._recent_requests.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "retry_rate": round(self._retries / self._requests, 3) if self._requests else 0.0,
+                "formats": {output_format: self._summarize(calls) for output_format, calls in self._calls.items()},
+            }
+
+    @staticmethod
+    def _summarize(calls: List[tuple]) -> dict:
+        latencies = sorted(latency for latency, _, _ in calls)
+        return {
+            "calls": len(calls),
+            "latency_p50_seconds": round(latencies[len(latencies) // 2], 3),
+            "avg_output_chars": round(sum(output_chars for _, output_chars, _ in calls) / len(calls), 1),
+            "success_rate": round(sum(1 for _, _, succeeded in calls if succeeded) / len(calls), 3),
+        }
+
+
+run_metrics = RunMetrics()
+fix_metrics = FixMetrics()
@@ -0,0 +1,96 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_huggingface import HuggingFacePipeline
+
+
+@lru_cache(maxsize=64)
+def adapter_base_model_id(model_id: str) -> Optional[str]:
+    """Base model of the PEFT adapter `model_id`, None if `model_id` is a full model."""
+    from peft import PeftConfig
+    try:
+        return PeftConfig.from_pretrained(model_id).base_model_name_or_path
+    except ValueError:
+        # No adapter_config.json: a full model
+        return None
+
+
+def adapter_name(model_id: str) -> str:
+    # PEFT adapter names become module keys, which cannot contain "." or "/"
+    return re.sub(r"\W", "_", model_id)
+
+
+class SharedBase:
+    """
+    One copy of a base model's weights with any number of LoRA adapters attached.
+
+    The base is loaded through the same `HuggingFacePipeline.from_model_id` call as
+    standalone models (same device placement and dtype) and wrapped in a PeftModel
+    when the first adapter is attached; every further adapter only adds its LoRA
+    weights. Generation picks the adapter per row with PEFT's `adapter_names`, so
+    requests for different adapters can share one batch.
+    """
+
+    def __init__(self, base_model_id: str, pipeline_kwargs: dict, load_kwargs: dict):
+        self.base_model_id = base_model_id
+        self.llm = HuggingFacePipeline.from_model_id(
+            model_id=base_model_id,
+            task="text-generation",
+            pipeline_kwargs=dict(pipeline_kwargs),
+            **load_kwargs,
+        )
+        self._adapters: Dict[str, str] = {}
+        self._adapter_bytes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Held while the inference scheduler generates on the base, so attaching an adapter
+        # (which may swap pipeline.model for a PeftModel) never happens mid-generation
+        self.generation_lock = threading.RLock()
+
+    @property
+    def pipeline(self):
+        return self.llm.pipeline
+
+    @property
+    def adapters(self) -> List[str]:
+        with self._lock:
+            return list(self._adapters)
+
+    def attach(self, model_id: str) -> str:
+        """Loads the adapter `model_id` onto the base (once) and returns its PEFT adapter name."""
+        from peft import PeftModel
+
+        name = adapter_name(model_id)
+        with self.generation_lock, self._lock:
+            if model_id in self._adapters:
+                return name
+            model = self.pipeline.model
+            if isinstance(model, PeftModel):
+                model.load_adapter(model_id, adapter_name=name)
+            else:
+                self.pipeline.model = PeftModel.from_pretrained(model, model_id, adapter_name=name)
+            self.pipeline.model.eval()
+            self._adapters[model_id] = name
+            self._adapter_bytes[model_id] = self._lora_bytes(name)
+            return name
+
+    def adapter_bytes(self, model_id: str) -> int:
+        with self._lock:
+            return self._adapter_bytes.get(model_id, 0)
+
+    def base_bytes(self) -> int:
+        try:
+            with self._lock:
+                lora_bytes = sum(self._adapter_bytes.values())
+            return int(self.pipeline.model.get_memory_footprint()) - lora_bytes
+        except Exception:
+            return 0
+
+    def _lora_bytes(self, name: str) -> int:
+        # Caller must hold self._lock
+        return sum(
+            parameter.numel() * parameter.element_size()
+            for parameter_name, parameter in self.pipeline.model.named_parameters()
+            if f".{name}." in parameter_name
+        )
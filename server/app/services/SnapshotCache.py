@@ -0,0 +1,277 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from github.Repository import Repository
+
+from app.models.models import RepositoryTree, RepositoryTreeEntry
+from app.services.tools.repository_tree import fetch_repository_tree, resolve_commit_sha
+
+
+# Root of the on-disk caches. They hold private repository contents: never a world-readable location
+CACHE_DIR = os.getenv("CODEMEDIC_CACHE_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "codemedic"
+)
+
+
+def ensure_private_dir(path: str) -> None:
+    """Creates `path` (and its parents) if needed, readable by this user only."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    # makedirs leaves an existing directory as it was
+    os.chmod(path, 0o700)
+
+
+class SnapshotCache:
+    """
+    Content-addressed cache of repository snapshots.
+
+    Trees are keyed by (repository, commit SHA) and file contents by blob SHA, so a
+    cached entry can never be stale; when a branch head moves, lookups by branch
+    resolve to the new commit, whose tree is fetched with one recursive Git Trees
+    call (a compare call costs the same and lacks sizes and directory SHAs), and
+    only changed blobs are fetched again. Older snapshots stay readable by commit SHA, so
+    requests still working on them are unaffected, until the LRU evicts them.
+    Entries live in a byte-bounded in-memory LRU and are spilled to a
+    byte-bounded on-disk LRU, shared by every worker on the host.
+    """
+
+    def __init__(self, cache_dir: str, memory_budget_bytes: int, disk_budget_bytes: int):
+        self.cache_dir = cache_dir
+        try:
+            ensure_private_dir(cache_dir)
+        except OSError as e:
+            print(f"⚠️ Could not create the snapshot cache directory: {str(e)}")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self._heads: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "tree_hits": 0,
+            "tree_misses": 0,
+            "blob_hits": 0,
+            "blob_misses": 0,
+            "disk_hits": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "head_moves": 0,
+        }
+
+    # ----- Read-through API -----
+
+    def get_tree(self, repo: Repository, ref: Optional[str] = None) -> RepositoryTree:
+        """Returns the tree at the head of `ref` (default branch if omitted)."""
+        branch = ref or repo.default_branch
+        commit_sha = resolve_commit_sha(repo, branch)
+        self._track_head(repo.full_name, branch, commit_sha)
+
+        key = self._tree_key(repo.full_name, commit_sha)
+        cached = self._get(key)
+        if cached is not None:
+            self._count("tree_hits")
+            return RepositoryTree.model_validate_json(cached)
+
+        self._count("tree_misses")
+        tree = fetch_repository_tree(repo, commit_sha)
+        self._put(key, tree.model_dump_json().encode("utf-8"))
+        return tree
+
+    def get_blob(self, repo: Repository, blob_sha: str) -> bytes:
+        """Returns the raw content of a blob, fetching it only on a miss."""
+        key = self._blob_key(blob_sha)
+        cached = self._get(key)
+        if cached is not None:
+            self._count("blob_hits")
+            return cached
+
+        self._count("blob_misses")
+        git_blob = repo.get_git_blob(blob_sha)
+        content = base64.b64decode(git_blob.content) if git_blob.encoding == "base64" else git_blob.content.encode("utf-8")
+        self._put(key, content)
+        return content
+
+    def get_file(
+            self,
+            repo: Repository,
+            file_path: str,
+            ref: Optional[str] = None
+    ) -> Tuple[Optional[RepositoryTreeEntry], Optional[bytes]]:
+        """
+        Looks `file_path` up in the cached tree. Returns (None, None) if the path does
+        not exist and (entry, None) if it is a directory.
+        """
+        tree = self.get_tree(repo, ref)
+        normalized_path = file_path.strip("/")
+        entry = next((entry for entry in tree.entries if entry.path == normalized_path), None)
+        if entry is None or entry.type != "blob":
+            return entry, None
+        return entry, self.get_blob(repo, entry.sha)
+
+    def invalidate(self, repository: str) -> None:
+        """Forgets the known branch heads of `repository` so the next read re-resolves them."""
+        with self._lock:
+            for head_key in [head_key for head_key in self._heads if head_key[0] == repository]:
+                del self._heads[head_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = sum(self._counters[name] for name in ("tree_hits", "tree_misses", "blob_hits", "blob_misses"))
+            hits = self._counters["tree_hits"] + self._counters["blob_hits"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "disk_bytes": self._disk_bytes or 0,
+                "disk_budget_bytes": self.disk_budget_bytes,
+                "cache_dir": self.cache_dir,
+            }
+
+    # ----- Head tracking -----
+
+    def _track_head(self, repository: str, branch: str, commit_sha: str) -> None:
+        """Records the branch head, counting it as a move if it changed."""
+        with self._lock:
+            previous_sha = self._heads.get((repository, branch))
+            self._heads[(repository, branch)] = commit_sha
+            if previous_sha is None or previous_sha == commit_sha:
+                return
+            self._counters["head_moves"] += 1
+        print(f"♻️ `{repository}@{branch}` moved from {previous_sha[:7]} to {commit_sha[:7]}")
+
+    # ----- Storage tiers -----
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        content = self._read_from_disk(key)
+        if content is not None:
+            self._count("disk_hits")
+            self._put_in_memory(key, content)
+        return content
+
+    def _put(self, key: str, content: bytes) -> None:
+        self._put_in_memory(key, content)
+        self._write_to_disk(key, content)
+
+    def _put_in_memory(self, key: str, content: bytes) -> None:
+        if len(content) > self.memory_budget_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = content
+            self._memory_bytes += len(content)
+            while self._memory_bytes > self.memory_budget_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._counters["memory_evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _read_from_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            os.utime(path)  # Mark as recently used for the disk LRU
+            return content
+        except OSError:
+            return None
+
+    def _write_to_disk(self, key: str, content: bytes) -> None:
+        if len(content) > self.disk_budget_bytes:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # Write atomically so concurrent workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not spill snapshot to disk: {str(e)}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(content)
+            over_budget = self._disk_bytes > self.disk_budget_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict_disk(self) -> None:
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        # Evict least recently used files down to 90% of the budget
+        target = int(self.disk_budget_bytes * 0.9)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self._counters["disk_evictions"] += evicted
+
+    # ----- Helpers -----
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _tree_key(repository: str, commit_sha: str) -> str:
+        return f"tree:{repository}@{commit_sha}"
+
+    @staticmethod
+    def _blob_key(blob_sha: str) -> str:
+        return f"blob:{blob_sha}"
+
+
+snapshot_cache = SnapshotCache(
+    cache_dir=os.getenv("CODEMEDIC_SNAPSHOT_CACHE_DIR", os.path.join(CACHE_DIR, "snapshots")),
+    memory_budget_bytes=int(os.getenv("CODEMEDIC_SNAPSHOT_CACHE_MEMORY_MB", "256")) * 1024 * 1024,
+    disk_budget_bytes=int(os.getenv("CODEMEDIC_SNAPSHOT_CACHE_DISK_MB", "2048")) * 1024 * 1024,
+)
@@ -0,0 +1,318 @@
+import ast
+import gzip
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from github.Repository import Repository
+
+from app.models.models import (
+    FileSymbols,
+    RepositoryTree,
+    SymbolCall,
+    SymbolDefinition,
+    SymbolImport,
+    SymbolIndexData,
+)
+from app.services.SnapshotCache import CACHE_DIR, ensure_private_dir, snapshot_cache
+
+# Files above this size are not indexed (generated code, vendored bundles)
+MAX_INDEXED_FILE_BYTES = 512 * 1024
+
+# Used when a file does not parse (the buggy file is often the one we need)
+_DEFINITION_LINE_RE = re.compile(r"^(?P<indent>[ \t]*)(?:async[ \t]+)?(?P<keyword>def|class)[ \t]+(?P<name>[A-Za-z_]\w*)")
+
+
+def module_name(path: str) -> str:
+    module = path[:-3] if path.endswith(".py") else path
+    module = module.replace("/", ".")
+    return module[:-len(".__init__")] if module.endswith(".__init__") else module
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.definitions: List[SymbolDefinition] = []
+        self.imports: List[SymbolImport] = []
+        self.calls: List[SymbolCall] = []
+        self._scope: List[str] = []
+
+    def visit_FunctionDef(self, node):
+        self._visit_definition(node, "function")
+
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_definition(node, "function")
+
+    def visit_ClassDef(self, node):
+        self._visit_definition(node, "class")
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.append(SymbolImport(module=alias.name, line=node.lineno))
+
+    def visit_ImportFrom(self, node):
+        module = "." * node.level + (node.module or "")
+        self.imports.append(SymbolImport(module=module, names=[alias.name for alias in node.names], line=node.lineno))
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+        elif isinstance(node.func, ast.Attribute):
+            name = node.func.attr
+        else:
+            name = None
+        if name:
+            self.calls.append(SymbolCall(name=name, line=node.lineno, caller=".".join(self._scope) or None))
+        self.generic_visit(node)
+
+    def _visit_definition(self, node, kind: str):
+        self._scope.append(node.name)
+        start_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        self.definitions.append(SymbolDefinition(
+            qualname=".".join(self._scope),
+            kind=kind,
+            start_line=start_line,
+            end_line=getattr(node, "end_lineno", None) or node.lineno,
+        ))
+        self.generic_visit(node)
+        self._scope.pop()
+
+
+def parse_python_symbols(path: str, blob_sha: str, source: str) -> FileSymbols:
+    """Definitions, imports and call sites of one Python file."""
+    file_symbols = FileSymbols(path=path, blob_sha=blob_sha, module=module_name(path))
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError) as e:
+        file_symbols.parse_error = str(e)
+        file_symbols.definitions = _scan_definitions(source)
+        return file_symbols
+
+    visitor = _SymbolVisitor()
+    visitor.visit(tree)
+    file_symbols.definitions = visitor.definitions
+    file_symbols.imports = visitor.imports
+    file_symbols.calls = visitor.calls
+    return file_symbols
+
+
+def _scan_definitions(source: str) -> List[SymbolDefinition]:
+    """Line-based fallback for unparsable files: a definition ends where the next one at the same or lower indent starts."""
+    lines = source.splitlines()
+    found: List[Tuple[int, int, str, str]] = []
+    for number, line in enumerate(lines, start=1):
+        match = _DEFINITION_LINE_RE.match(line)
+        if match:
+            found.append((number, len(match.group("indent").expandtabs()), match.group("keyword"), match.group("name")))
+
+    definitions = []
+    scope: List[Tuple[int, str]] = []
+    for index, (start_line, indent, keyword, name) in enumerate(found):
+        while scope and scope[-1][0] >= indent:
+            scope.pop()
+        scope.append((indent, name))
+        first_line = start_line
+        while first_line > 1 and lines[first_line - 2].strip().startswith("@"):
+            first_line -= 1
+        end_line = len(lines)
+        for next_start, next_indent, _, _ in found[index + 1:]:
+            if next_indent <= indent:
+                end_line = next_start - 1
+                break
+        # Do not count trailing blank lines as part of the definition
+        while end_line > start_line and not lines[end_line - 1].strip():
+            end_line -= 1
+        definitions.append(SymbolDefinition(
+            qualname=".".join(scope_name for _, scope_name in scope),
+            kind="class" if keyword == "class" else "function",
+            start_line=first_line,
+            end_line=end_line,
+        ))
+    return definitions
+
+
+class SymbolIndex:
+    """Query helpers over the symbol data of one repository snapshot."""
+
+    def __init__(self, data: SymbolIndexData):
+        self.data = data
+
+    def find_definitions(self, symbol: str) -> List[Tuple[FileSymbols, SymbolDefinition]]:
+        """Matches `name`, `Class.method` or `package.module.name`."""
+        matches = []
+        for file_symbols in self.data.files.values():
+            for definition in file_symbols.definitions:
+                full_name = f"{file_symbols.module}.{definition.qualname}"
+                if (
+                    definition.qualname == symbol
+                    or definition.qualname.endswith(f".{symbol}")
+                    or full_name == symbol
+                ):
+                    matches.append((file_symbols, definition))
+        # Top-level definitions first, they are what an issue usually means
+        return sorted(matches, key=lambda match: (match[1].qualname.count("."), match[0].path))
+
+    def find_calls(self, symbol: str) -> List[Tuple[FileSymbols, SymbolCall]]:
+        name = symbol.rsplit(".", 1)[-1]
+        return [
+            (file_symbols, call)
+            for file_symbols in self.data.files.values()
+            for call in file_symbols.calls
+            if call.name == name
+        ]
+
+
+class SymbolIndexStore:
+    """
+    Builds symbol indexes from snapshot-cache blobs and keeps them by commit SHA,
+    in a small in-memory LRU and as compact gzipped JSON on disk.
+
+    When the branch moves, the new index is derived from the latest one of the
+    same repository: only files whose blob SHA changed are fetched and parsed
+    again. Each commit gets its own immutable index version, so requests still
+    working on an older SHA keep their index; the last `disk_versions` versions
+    per repository are kept on disk.
+    """
+
+    def __init__(self, index_dir: str, memory_capacity: int = 8, disk_versions: int = 5, fetch_workers: int = 8):
+        self.index_dir = index_dir
+        try:
+            ensure_private_dir(index_dir)
+        except OSError as e:
+            print(f"⚠️ Could not create the symbol index directory: {str(e)}")
+        self.memory_capacity = memory_capacity
+        self.disk_versions = disk_versions
+        self.fetch_workers = fetch_workers
+        self._indexes: "OrderedDict[Tuple[str, str], SymbolIndex]" = OrderedDict()
+        self._latest: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._counters = {"full_builds": 0, "incremental_builds": 0, "files_parsed": 0, "files_reused": 0}
+
+    def get(self, repo: Repository, ref: Optional[str] = None) -> SymbolIndex:
+        """Index of the tree at the head of `ref` (default branch if omitted)."""
+        tree = snapshot_cache.get_tree(repo, ref)
+        key = (tree.repository, tree.commit_sha)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._indexes:
+                    return self._indexes[key]
+            index = self._load_from_disk(*key)
+            if index is None:
+                index = SymbolIndex(self._build(repo, tree, self._latest_index(tree.repository)))
+                self._save_to_disk(index.data)
+            with self._lock:
+                self._indexes[key] = index
+                self._latest[tree.repository] = tree.commit_sha
+                while len(self._indexes) > self.memory_capacity:
+                    self._indexes.popitem(last=False)
+                self._build_locks.pop(key, None)
+            return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "indexes_in_memory": [f"{repository}@{commit_sha[:7]}" for repository, commit_sha in self._indexes],
+            }
+
+    def _latest_index(self, repository: str) -> Optional[SymbolIndexData]:
+        """Most recent index of `repository`, used as the base of an incremental build."""
+        with self._lock:
+            commit_sha = self._latest.get(repository)
+            index = self._indexes.get((repository, commit_sha)) if commit_sha else None
+        if index is not None:
+            return index.data
+        versions = self._disk_versions(repository)
+        if versions:
+            index = self._load_from_disk(repository, os.path.basename(versions[-1]).split(".", 1)[0])
+            return index.data if index is not None else None
+        return None
+
+    def _build(self, repo: Repository, tree: RepositoryTree, base: Optional[SymbolIndexData] = None) -> SymbolIndexData:
+        python_entries = [
+            entry for entry in tree.entries
+            # An unknown size counts as too large
+            if entry.type == "blob" and entry.path.endswith(".py") and entry.size is not None and entry.size <= MAX_INDEXED_FILE_BYTES
+        ]
+        # Parse results depend only on the blob content (and path), so reuse them by blob SHA
+        reusable = {file_symbols.blob_sha: file_symbols for file_symbols in base.files.values()} if base else {}
+        files: Dict[str, FileSymbols] = {}
+        changed_entries = []
+        for entry in python_entries:
+            previous = reusable.get(entry.sha)
+            if previous is None:
+                changed_entries.append(entry)
+            elif previous.path == entry.path:
+                files[entry.path] = previous
+            else:
+                files[entry.path] = previous.model_copy(update={"path": entry.path, "module": module_name(entry.path)})
+
+        if base:
+            print(f"🗂️ Updating index of `{tree.repository}` {base.commit_sha[:7]} -> {tree.commit_sha[:7]}: "
+                  f"{len(changed_entries)} changed, {len(files)} reused")
+        else:
+            print(f"🗂️ Indexing {len(changed_entries)} Python files of `{tree.repository}`@{tree.commit_sha[:7]}")
+
+        def parse(entry) -> FileSymbols:
+            source = snapshot_cache.get_blob(repo, entry.sha).decode("utf-8", errors="replace")
+            return parse_python_symbols(entry.path, entry.sha, source)
+
+        # Blob fetches are I/O bound; blobs already in the snapshot cache cost nothing
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as pool:
+            for file_symbols in pool.map(parse, changed_entries):
+                files[file_symbols.path] = file_symbols
+
+        with self._lock:
+            self._counters["incremental_builds" if base else "full_builds"] += 1
+            self._counters["files_parsed"] += len(changed_entries)
+            self._counters["files_reused"] += len(files) - len(changed_entries)
+
+        return SymbolIndexData(repository=tree.repository, commit_sha=tree.commit_sha, files=files)
+
+    def _disk_versions(self, repository: str) -> List[str]:
+        """Index files of `repository` on disk, oldest first."""
+        directory = os.path.dirname(self._disk_path(repository, "x"))
+        try:
+            paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".json.gz")]
+        except OSError:
+            return []
+        return sorted(paths, key=lambda path: os.path.getmtime(path))
+
+    def _disk_path(self, repository: str, commit_sha: str) -> str:
+        return os.path.join(self.index_dir, repository.replace("/", "__"), f"{commit_sha}.json.gz")
+
+    def _load_from_disk(self, repository: str, commit_sha: str) -> Optional[SymbolIndex]:
+        try:
+            with gzip.open(self._disk_path(repository, commit_sha), "rb") as f:
+                return SymbolIndex(SymbolIndexData.model_validate_json(f.read()))
+        except (OSError, ValueError):
+            return None
+
+    def _save_to_disk(self, data: SymbolIndexData) -> None:
+        path = self._disk_path(data.repository, data.commit_sha)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(data.model_dump_json(exclude_defaults=True).encode("utf-8"))
+            os.replace(tmp_path, path)
+            for stale_path in self._disk_versions(data.repository)[:-self.disk_versions]:
+                os.remove(stale_path)
+        except OSError as e:
+            print(f"⚠️ Could not save symbol index: {str(e)}")
+
+
+symbol_index_store = SymbolIndexStore(
+    index_dir=os.getenv("CODEMEDIC_SYMBOL_INDEX_DIR", os.path.join(CACHE_DIR, "symbols")),
+    disk_versions=int(os.getenv("CODEMEDIC_SYMBOL_INDEX_VERSIONS", "5")),
+)
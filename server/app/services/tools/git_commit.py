@@ -0,0 +1,79 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from github import InputGitTreeElement
+from github.GithubException import GithubException
+from github.GitCommit import GitCommit
+from github.Repository import Repository
+
+from app.services.SnapshotCache import snapshot_cache
+
+# Blob uploads run in parallel; the rest of the commit is a fixed number of calls
+MAX_CONCURRENT_BLOBS = 8
+DEFAULT_FILE_MODE = "100644"
+
+
+def git_blob_sha(content: bytes) -> str:
+    """SHA git gives a blob with `content`, used to skip files whose content did not change."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def commit_files(repo: Repository, branch: str, files: Dict[str, str], message: str) -> Optional[GitCommit]:
+    """
+    Commits every file in `files` (path -> new content) to `branch` as one commit,
+    with the Git Data API:
+
+    1. read the branch ref and its commit, and its tree from the snapshot cache
+    2. hash the files locally and create blobs, concurrently, only for those that changed
+    3. create one tree on top of the base tree, one commit, and move the ref once
+
+    The ref only moves as a fast-forward; if the branch moved in the meantime, the
+    tree is rebuilt once on the new head (blobs are reused). Returns None when no
+    file actually changes.
+    """
+    files = {path.strip("/"): content for path, content in files.items()}
+    ref = repo.get_git_ref(f"heads/{branch}")
+    base_commit = repo.get_git_commit(ref.object.sha)
+
+    try:
+        entries = {entry.path: entry for entry in snapshot_cache.get_tree(repo, base_commit.sha).entries if entry.type == "blob"}
+    except Exception as e:
+        # Modes and unchanged-file detection are only a nicety: every file is uploaded as a regular file
+        print(f"⚠️ Could not read the tree of `{branch}`: {str(e)}")
+        entries = {}
+
+    changed = [
+        path for path, content in files.items()
+        if path not in entries or entries[path].sha != git_blob_sha(content.encode("utf-8"))
+    ]
+    if not changed:
+        return None
+    # Pooled clients are safe to share between threads, see GitHubGateway._GatewayConnection
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_BLOBS, len(changed)))) as executor:
+        blob_futures = {path: executor.submit(repo.create_git_blob, files[path], "utf-8") for path in changed}
+        blob_shas = {path: future.result().sha for path, future in blob_futures.items()}
+
+    elements = [
+        InputGitTreeElement(
+            path=path,
+            mode=entries[path].mode if path in entries and entries[path].mode else DEFAULT_FILE_MODE,
+            type="blob",
+            sha=blob_sha,
+        )
+        for path, blob_sha in blob_shas.items()
+    ]
+
+    for attempt in range(2):
+        tree = repo.create_git_tree(elements, base_tree=base_commit.tree)
+        commit = repo.create_git_commit(message, tree, [base_commit])
+        try:
+            ref.edit(sha=commit.sha, force=False)
+            return commit
+        except GithubException as e:
+            # 422: not a fast-forward, someone pushed to the branch since we read it
+            if e.status != 422 or attempt == 1:
+                raise
+            ref = repo.get_git_ref(f"heads/{branch}")
+            base_commit = repo.get_git_commit(ref.object.sha)
+            print(f"🔁 `{branch}` moved while committing, rebuilding the commit on {base_commit.sha[:7]}")
@@ -0,0 +1,63 @@
+import re
+from typing import List, Optional
+
+from github.Repository import Repository
+
+from app.models.models import RepositoryTree, RepositoryTreeEntry
+
+_COMMIT_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def resolve_commit_sha(repo: Repository, ref: Optional[str] = None) -> str:
+    """Resolves a branch name (default branch if omitted) or commit SHA to a commit SHA."""
+    if ref and _COMMIT_SHA_RE.match(ref):
+        return ref
+    branch = ref or repo.default_branch
+    return repo.get_git_ref(f"heads/{branch}").object.sha
+
+
+def fetch_repository_tree(repo: Repository, ref: Optional[str] = None) -> RepositoryTree:
+    """
+    Lists every file and directory of the repository at `ref` with one recursive
+    Git Trees API call (`git/trees/{sha}?recursive=1`).
+
+    GitHub truncates very large recursive trees; only in that case the listing
+    falls back to walking the tree one directory at a time.
+    """
+    commit_sha = resolve_commit_sha(repo, ref)
+    git_tree = repo.get_git_tree(commit_sha, recursive=True)
+
+    if git_tree.raw_data.get("truncated"):
+        print(f"⚠️ Recursive tree of `{repo.full_name}` is truncated, walking it per directory")
+        entries = _walk_tree(repo, git_tree.sha)
+    else:
+        entries = [_to_entry(element) for element in git_tree.tree]
+
+    return RepositoryTree(
+        repository=repo.full_name,
+        commit_sha=commit_sha,
+        entries=[entry for entry in entries if entry.type in ("blob", "tree")],
+    )
+
+
+def _walk_tree(repo: Repository, root_tree_sha: str) -> List[RepositoryTreeEntry]:
+    entries = []
+    pending = [("", root_tree_sha)]
+    while pending:
+        prefix, tree_sha = pending.pop(0)
+        for element in repo.get_git_tree(tree_sha).tree:
+            entry = _to_entry(element, prefix)
+            entries.append(entry)
+            if entry.type == "tree":
+                pending.append((f"{entry.path}/", entry.sha))
+    return entries
+
+
+def _to_entry(element, prefix: str = "") -> RepositoryTreeEntry:
+    return RepositoryTreeEntry(
+        path=f"{prefix}{element.path}",
+        type=element.type,
+        sha=element.sha,
+        size=element.size,
+        mode=element.mode,
+    )
@@ -1,10 +1,22 @@
 from dotenv import load_dotenv
+import json
 import os
-from github import Github
+from typing import List
+
 from github.GithubException import GithubException
 from langchain_core.tools import tool
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+
+from app.models.models import FileEditInput, FixedCodeIssue
+from app.services.CodeFixer import generate_fixed_code, generate_region_fix
+from app.services.GitHubGateway import github_gateway
+from app.services.RunMetrics import fix_metrics
+from app.services.SnapshotCache import snapshot_cache
+from app.services.SymbolIndex import symbol_index_store
+from app.services.tools.git_commit import commit_files
+
+# find_symbol_definition keeps its answer small: a few matches, each capped in length
+MAX_SYMBOL_MATCHES = 3
+MAX_SYMBOL_SOURCE_LINES = 80
 
 
 @tool
@@ -13,19 +25,10 @@ def get_repository_file_names(github_token: str, repository: str) -> str:
     Returns the list of file names from the root of the given GitHub repository.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
-        contents = repo.get_contents("")
-        files_list = []
-        dirs_list = []
-        
-        while contents:
-            file_content = contents.pop(0)
-            if file_content.type == "dir":
-                dirs_list.append(file_content.path)
-                contents.extend(repo.get_contents(file_content.path))
-            else:
-                files_list.append(file_content.path)
+        repo = github_gateway.repo(github_token, repository)
+        repository_tree = snapshot_cache.get_tree(repo)
+        files_list = repository_tree.file_paths()
+        dirs_list = repository_tree.dir_paths()
         
         result = f"📁 Repository `{repository}` structure:\n\n"
         
@@ -51,15 +54,16 @@ def get_repository_file_content(github_token: str, repository: str, file_name: s
     Retrieves the content of a specific file from the GitHub repository.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         
-        # Try to get the file content
-        content = repo.get_contents(file_name)
+        # Read through the snapshot cache (tree by commit SHA, content by blob SHA)
+        entry, content = snapshot_cache.get_file(repo, file_name)
+        if entry is None:
+            return f"❌ File `{file_name}` not found in repository `{repository}`. Please check the file path and try again. Use get_repository_file_names to see available files."
         
         # Check if it's a file (not a directory)
-        if content.type == "file":
-            decoded_content = content.decoded_content.decode('utf-8')
+        if content is not None:
+            decoded_content = content.decode('utf-8')
             return f"📄 The file `{file_name}` contains:\n\n```\n{decoded_content}\n```"
         else:
             return f"❌ `{file_name}` is a directory, not a file. Use get_repository_file_names to list contents."
@@ -71,14 +75,49 @@ def get_repository_file_content(github_token: str, repository: str, file_name: s
         else:
             return f"❌ Error getting file content: {error_msg}"
 
+@tool
+def find_symbol_definition(github_token: str, repository: str, symbol: str) -> str:
+    """
+    Finds where a Python function or class (e.g. `division`, `Calculator.add`) is defined
+    and returns its file, line span and source, plus the places that call it.
+    Use it instead of reading whole files when the issue names a function or class.
+    """
+    try:
+        repo = github_gateway.repo(github_token, repository)
+        index = symbol_index_store.get(repo)
+        # Accept call expressions as written in issues, e.g. `division(23, 0)`
+        symbol = symbol.split("(", 1)[0].strip().strip("`")
+        definitions = index.find_definitions(symbol)
+        if not definitions:
+            return f"❌ No definition of `{symbol}` found in `{repository}`. Use get_repository_file_names to browse the repository."
+
+        result = f"🔎 `{symbol}` is defined in:\n\n"
+        for file_symbols, definition in definitions[:MAX_SYMBOL_MATCHES]:
+            lines = snapshot_cache.get_blob(repo, file_symbols.blob_sha).decode("utf-8", errors="replace").splitlines()
+            end_line = min(definition.end_line, definition.start_line + MAX_SYMBOL_SOURCE_LINES - 1)
+            source = "\n".join(lines[definition.start_line - 1:end_line])
+            truncated = "\n# ... (truncated)" if end_line < definition.end_line else ""
+            result += f"📄 `{file_symbols.path}` lines {definition.start_line}-{definition.end_line} ({definition.kind} `{definition.qualname}`"
+            result += ", file does not parse" if file_symbols.parse_error else ""
+            result += f"):\n```\n{source}{truncated}\n```\n\n"
+
+        calls = index.find_calls(symbol)
+        if calls:
+            result += "📞 Called from:\n"
+            for file_symbols, call in calls[:MAX_SYMBOL_MATCHES * 3]:
+                result += f"  - {file_symbols.path}:{call.line}" + (f" in `{call.caller}`" if call.caller else "") + "\n"
+        return result
+
+    except Exception as e:
+        return f"❌ Error looking up symbol: {str(e)}"
+
 @tool
 def create_branch(github_token: str, repository: str, base_branch: str, new_branch: str) -> str:
     """
     Creates a new branch from the specified base branch.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         base_ref = repo.get_git_ref(f"heads/{base_branch}")
         base_sha = base_ref.object.sha
         new_ref = f"refs/heads/{new_branch}"
@@ -104,8 +143,7 @@ def update_file_in_branch(
     Updates a file in the specified GitHub branch.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         contents = repo.get_contents(file_path, ref=branch)
         current_sha = contents.sha
 
@@ -120,6 +158,31 @@ def update_file_in_branch(
     except Exception as e:
         return f"❌ Error updating file: {str(e)}"
 
+@tool
+def commit_files_to_branch(
+        github_token: str,
+        repository: str,
+        branch: str,
+        files: List[FileEditInput],
+        commit_message: str
+) -> str:
+    """
+    Commits several files to the specified GitHub branch as a single commit.
+    Each file is a {"file_path": ..., "content": ...} object with the full new content.
+    """
+    try:
+        repo = github_gateway.repo(github_token, repository)
+        edits = [FileEditInput.model_validate(file) for file in files]
+        commit = commit_files(repo, branch, {edit.file_path: edit.content for edit in edits}, commit_message)
+        if commit is None:
+            return f"⚠️ No changes to commit: the files on `{branch}` already have this content."
+        paths = ", ".join(f"`{edit.file_path}`" for edit in edits)
+        return f"✅ Committed {len(edits)} file(s) ({paths}) to branch `{branch}` as {commit.sha[:7]}: '{commit_message}'"
+    except GithubException as e:
+        return f"❌ GitHub error: {e.data.get('message', str(e)) if isinstance(e.data, dict) else str(e)}"
+    except Exception as e:
+        return f"❌ Error committing files: {str(e)}"
+
 @tool
 def create_pull_request(
         github_token: str,
@@ -133,8 +196,7 @@ def create_pull_request(
     Creates a pull request with the given data.
     """
     try:
-        github_client = Github(github_token)
-        repo = github_client.get_repo(repository)
+        repo = github_gateway.repo(github_token, repository)
         pull_request = repo.create_pull(
             title=title,
             body=body,
@@ -146,7 +208,56 @@ def create_pull_request(
         return f"❌ Error creating pull request: {str(e)}"
 
 @tool
-def fix_code_issues(buggy_code: str) -> dict:
+def publish_fix(
+        github_token: str,
+        repository: str,
+        branch: str,
+        files: List[FileEditInput],
+        commit_message: str,
+        pr_title: str,
+        pr_body: str,
+        base_branch: str = ""
+) -> str:
+    """
+    Publishes a fix in one step: creates `branch` from `base_branch` (default branch if empty),
+    commits all the files to it as one commit and opens a pull request.
+    Each file is a {"file_path": ..., "content": ...} object with the full new content.
+    Safe to retry: an existing branch and open pull request are reused.
+    """
+    try:
+        repo = github_gateway.repo(github_token, repository)
+        base_branch = base_branch or repo.default_branch
+
+        try:
+            repo.get_git_ref(f"heads/{branch}")
+            branch_status = f"reused branch `{branch}`"
+        except GithubException as e:
+            if e.status != 404:
+                raise
+            base_sha = repo.get_git_ref(f"heads/{base_branch}").object.sha
+            repo.create_git_ref(ref=f"refs/heads/{branch}", sha=base_sha)
+            branch_status = f"created branch `{branch}` from `{base_branch}`"
+
+        edits = [FileEditInput.model_validate(file) for file in files]
+        commit = commit_files(repo, branch, {edit.file_path: edit.content for edit in edits}, commit_message)
+        # No commit on a retry means the files were already committed by the previous attempt
+        commit_status = f"committed {len(edits)} file(s) as {commit.sha[:7]}" if commit else "files already up to date"
+
+        open_pulls = repo.get_pulls(state="open", head=f"{repo.owner.login}:{branch}", base=base_branch)
+        pull_request = next(iter(open_pulls), None)
+        if pull_request is None:
+            pull_request = repo.create_pull(title=pr_title, body=pr_body, head=branch, base=base_branch)
+            pull_status = "pull request created"
+        else:
+            pull_status = "existing pull request reused"
+        return f"✅ Fix published ({branch_status}, {commit_status}, {pull_status}): {pull_request.html_url}"
+    except GithubException as e:
+        return f"❌ GitHub error: {e.data.get('message', str(e)) if isinstance(e.data, dict) else str(e)}"
+    except Exception as e:
+        return f"❌ Error publishing fix: {str(e)}"
+
+@tool
+def fix_code_issues(buggy_code: str, bypass_cache: bool = False) -> dict:
     """
         Analyzes the given Python code for syntax or logical errors and returns a corrected version.
 
@@ -155,10 +266,11 @@ def fix_code_issues(buggy_code: str) -> dict:
 
         Args:
             buggy_code (str): A Python code snippet that contains one or more errors.
+            bypass_cache (bool): Generate a new fix even if this code was fixed before.
 
         Returns:
-            dict: A dictionary containing the corrected version of the code. If the model fails to produce valid JSON,
-                  an error message is included in the output.
+            dict: A dictionary containing the corrected version of the code. If the model fails to produce a valid,
+                  parsable fix, an "error" entry is returned instead.
         """
     load_dotenv(dotenv_path=".env")
     endpoint_gpt4 = os.getenv("AZURE_OPENAI_ENDPOINT_GPT4")
@@ -173,30 +285,42 @@ def fix_code_issues(buggy_code: str) -> dict:
     # )
     print("Generating code...")
 
-    model_id = "TheCasvi/Qwen3-4B-CodeMedic-adapter"
-    llm = HuggingFacePipeline.from_model_id(
-        model_id=model_id,
-        task="text-generation",
-        pipeline_kwargs={
-            "max_new_tokens": 1000,
-            "do_sample": False,
-            "repetition_penalty": 1.03,
-        }
-    )
-    chat_model = ChatHuggingFace(llm=llm, model_id=model_id)
-    messages = [
-        SystemMessage(content="You're a helpful code assistant"),
-        HumanMessage(
-            content=f"""
-               Fix the following buggy Python code. Respond only with JSON using this format:
-               {{ "fixed_code": "..." }}
-
-               Code:
-               {buggy_code}
-            """
-        ),
-    ]
-    print("prompt: ", messages)
-    result = chat_model.invoke(messages)
-    print("fine_tuned mode result: ", result)
-    return result
\ No newline at end of file
+    fix_metrics.record_request(buggy_code)
+    # Diff or full-code contract depending on CODEMEDIC_FIX_OUTPUT_FORMAT, with fallback to full code;
+    # full-code answers are schema-constrained, parsed and validated here, never returned raw
+    fixed_code, _ = generate_fixed_code(buggy_code, use_cache=not bypass_cache)
+    if fixed_code is None:
+        return {"error": "The fix model did not return a usable fix"}
+    return FixedCodeIssue(fixed_code=fixed_code).model_dump()
+
+
+@tool
+def fix_code_region(
+        github_token: str, repository: str, file_path: str, line: int = 0, symbol: str = "", bypass_cache: bool = False
+) -> str:
+    """
+    Fixes only the function or class around `line` (e.g. the traceback line) or named `symbol`
+    in `file_path`, and returns the whole file with that part corrected as { "fixed_code": "..." }.
+    Prefer it over fix_code_issues when the issue points at a line or a function: it is much
+    faster on large files. Publish the returned fixed_code as that file's content with publish_fix.
+    Set `bypass_cache` to generate a new fix when the previous one for this region was not usable.
+    """
+    try:
+        repo = github_gateway.repo(github_token, repository)
+        entry, content = snapshot_cache.get_file(repo, file_path)
+        if entry is None:
+            return f"❌ File `{file_path}` not found in repository `{repository}`. Use get_repository_file_names to see available files."
+        if content is None:
+            return f"❌ `{file_path}` is a directory, not a file."
+        if not line and not symbol:
+            return "❌ Pass the line number or the function/class name of the bug, or use fix_code_issues for the whole code."
+
+        fix_metrics.record_request(f"{repository}:{file_path}:{line}:{symbol}")
+        fixed_code, _ = generate_region_fix(
+            content.decode("utf-8"), line or None, symbol or None, file_path=file_path, use_cache=not bypass_cache
+        )
+        if fixed_code is None:
+            return f"⚠️ Could not fix an isolated region of `{file_path}`. Use get_repository_file_content and fix_code_issues on the whole file instead."
+        return f"✅ Fixed `{file_path}`:\n{json.dumps({'fixed_code': fixed_code})}"
+    except Exception as e:
+        return f"❌ Error fixing code region: {str(e)}"
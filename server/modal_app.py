@@ -1,5 +1,5 @@
 import modal
-from typing import Any, Dict
+from typing import Optional
 import os
 
 # Crear la aplicación Modal
@@ -10,13 +10,40 @@ image = (
     modal.Image.debian_slim()
     .pip_install_from_requirements("requirements.txt")
     .copy_local_dir("./app", "/root/app")  # Copiar el directorio app completo
-    .env({"PYTHONPATH": "/root"})
+    .copy_local_dir("./scripts", "/root/scripts")
+    # Los jobs se guardan en un modal.Dict compartido: cualquier contenedor puede consultarlos
+    .env({"PYTHONPATH": "/root", "CODEMEDIC_MERGED_MODELS_DIR": "/models", "CODEMEDIC_JOB_STORE": "modal"})
+    # Fusionar el adapter con el modelo base al construir la imagen: el contenedor carga
+    # un único checkpoint safetensors (mmap) en vez de base + adapter en cada arranque en frío
+    .run_commands(
+        "cd /root && python -m scripts.export_merged_model --output-dir /models",
+        secrets=[modal.Secret.from_name("huggingface-secret")],
+    )
 )
 
+# Cada job del agente corre como su propia llamada a esta función: no depende de la petición
+# HTTP que lo creó (ni de su timeout), y Modal no recicla el contenedor a mitad del job
+@app.function(
+    image=image,
+    gpu="L4",
+    timeout=3600,  # Un job puede tardar mucho más que una petición HTTP
+    secrets=[modal.Secret.from_name("huggingface-secret")]
+)
+def run_fix_job(job_id: str, github_credentials: dict, issue_data: dict, mode: str, fix_model):
+    """Ejecuta un job del agente; el estado, el progreso y el resultado van al job store compartido"""
+    import sys
+    sys.path.append("/root")
+
+    from app.models.models import GitHubCredentials, GitHubIssue
+    from app.services.JobService import run_agent_job
+
+    run_agent_job(job_id, GitHubCredentials(**github_credentials), GitHubIssue(**issue_data), mode, fix_model)
+
 @app.function(
     image=image,
     gpu="L4",  # Empezamos con L4 que es más barato para pruebas
     timeout=300,  # 5 minutos de timeout
+    allow_concurrent_inputs=32,  # Varios issues por contenedor; el agente corre en el pool de workers
     secrets=[modal.Secret.from_name("huggingface-secret")]
 )
 @modal.asgi_app()
@@ -32,6 +59,11 @@ def fastapi_app():
     
     from app.models.models import GitHubIssue, GitHubCredentials
     from app.services.AgentService import AgentService
+    from app.services.ModelRegistry import ALLOWED_FIX_MODEL_IDS, model_registry, preload_models_from_env
+    from app.services.AgentExecutor import agent_executor
+    from app.routers.AgentRoutes import router as agent_router
+    from app.routers.JobRoutes import router as job_router
+    from app.services.JobService import job_service
     
     # Crear la aplicación FastAPI
     fastapi = FastAPI(
@@ -55,10 +87,29 @@ def fastapi_app():
         version="1.0.0"
     )
     
+    # API de jobs: POST /api/fix/jobs devuelve un job_id al instante y se consulta por polling,
+    # así los arreglos largos no dependen de mantener abierta una petición HTTP.
+    # Cada job se lanza con run_fix_job.spawn y se sigue desde el modal.Dict compartido
+    job_service.set_dispatcher(
+        lambda job_id, github_credentials, issue_data, mode, fix_model: run_fix_job.spawn(
+            job_id, github_credentials.model_dump(mode="json"), issue_data.model_dump(mode="json"), mode, fix_model
+        )
+    )
+    fastapi.include_router(job_router, prefix="/api")
+    # Streaming (SSE): POST /api/fix/issue/stream envía cada paso del agente en cuanto ocurre
+    fastapi.include_router(agent_router, prefix="/api")
+
+    @fastapi.on_event("startup")
+    def preload_models():
+        # Carga los modelos de CODEMEDIC_PRELOAD_MODELS al arrancar el contenedor
+        preload_models_from_env()
+
     # Modelo para el request
     class FixIssueRequest(BaseModel):
         github_credentials: dict
         issue_data: dict
+        mode: str = "react"  # "react" o "pipeline" (flujo fijo, el LLM solo localiza y arregla)
+        fix_model: Optional[str] = None  # Adapter de arreglo; por defecto lo elige el router de modelos
         
         class Config:
             schema_extra = {
@@ -108,16 +159,21 @@ def fastapi_app():
                 raise HTTPException(status_code=500, detail="HuggingFace token no encontrado en secrets")
                         
             # Validar y parsear los datos de entrada
+            if request_data.fix_model is not None and request_data.fix_model not in ALLOWED_FIX_MODEL_IDS:
+                raise HTTPException(status_code=400, detail=f"fix_model desconocido, debe ser uno de {ALLOWED_FIX_MODEL_IDS}")
             github_credentials = GitHubCredentials(**request_data.github_credentials)
             issue_data = GitHubIssue(**request_data.issue_data)
             
             # Crear el servicio y procesar con ReactAgent
-            agent_service = AgentService(github_credentials, issue_data)
-            agent_response = agent_service.fix_issue_structured()  # Internamente usa ReactAgent
+            agent_service = AgentService(github_credentials, issue_data, request_data.mode, request_data.fix_model)
+            # Internamente usa ReactAgent; se ejecuta en el pool para no bloquear el event loop
+            agent_response = await agent_executor.run(agent_service.fix_issue_structured)
             
             print("ReactAgent response:", agent_response)
             return {"status": "success", "data": agent_response}
             
+        except HTTPException:
+            raise
         except Exception as e:
             import traceback
             print(f"Error in ReactAgent processing: {str(e)}")
@@ -143,6 +199,8 @@ def fastapi_app():
             "agent_type": "ReactAgent",
             "model": "Qwen/Qwen3-4B",
             "provider": "HuggingFace",
+            "model_pool": model_registry.stats(),
+            "agents": agent_executor.stats(),
             "docs_url": "/docs",
             "redoc_url": "/redoc"
         }
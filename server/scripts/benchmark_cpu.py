@@ -0,0 +1,114 @@
+"""
+Benchmarks CPU inference of the fix model: generated tokens/sec, latency and
+memory (RSS) per weight quantization, with and without prompt KV-cache reuse.
+
+Run from the `server` directory:
+
+    python -m scripts.benchmark_cpu [snippet.py ...] [--quantizations none,int8,int4] [--threads 8] [--runs 3]
+
+Each configuration runs in its own process, so load time and RSS are not
+polluted by the models of the previous one. Pointing CODEMEDIC_MERGED_MODELS_DIR
+at a merged export (scripts/export_merged_model.py) benchmarks that instead of
+base model + adapter.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from app.services.CodeFixer import build_fix_messages
+from app.services.CpuInference import process_rss_bytes
+from app.services.InferenceScheduler import inference_scheduler
+from app.services.ModelRegistry import DEFAULT_FIX_MODEL_ID, model_registry
+from scripts.benchmark_decoding import SAMPLE_SNIPPETS
+
+
+def run_worker(args) -> dict:
+    """Runs one configuration, as set by the parent process in the CODEMEDIC_* environment."""
+    snippets = load_snippets(args.snippets)
+    started = time.perf_counter()
+    model_registry.preload([args.model])
+    load_seconds = time.perf_counter() - started
+    tokenizer = model_registry.get(args.model).llm.pipeline.tokenizer
+
+    # Warm-up run, not measured (it also seeds the prompt cache's prefix)
+    inference_scheduler.generate(args.model, build_fix_messages(snippets[0]), max_new_tokens=16)
+    seconds, tokens = [], []
+    for _ in range(args.runs):
+        for snippet in snippets:
+            started = time.perf_counter()
+            message = inference_scheduler.generate(args.model, build_fix_messages(snippet), max_new_tokens=args.max_new_tokens)
+            seconds.append(time.perf_counter() - started)
+            tokens.append(len(tokenizer.encode(str(message.content), add_special_tokens=False)))
+
+    return {
+        "load_seconds": round(load_seconds, 1),
+        "tokens_per_second": round(sum(tokens) / sum(seconds), 2),
+        "latency_p50_seconds": round(statistics.median(seconds), 2),
+        "rss_mb": round(process_rss_bytes() / 2 ** 20),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+
+
+def load_snippets(paths) -> list:
+    if not paths:
+        return SAMPLE_SNIPPETS
+    snippets = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            snippets.append(f.read())
+    return snippets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snippets", nargs="*", help="Python files to fix (default: built-in samples)")
+    parser.add_argument("--model", default=DEFAULT_FIX_MODEL_ID)
+    parser.add_argument("--quantizations", default="none,int8,int4")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (default: torch's default)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = {}
+    for quantization in args.quantizations.split(","):
+        for prompt_cache in ("0", "1"):
+            env = {
+                **os.environ,
+                "CODEMEDIC_INFERENCE_DEVICE": "cpu",
+                "CODEMEDIC_CPU_QUANTIZATION": quantization,
+                "CODEMEDIC_CPU_THREADS": str(args.threads),
+                "CODEMEDIC_PROMPT_CACHE": prompt_cache,
+            }
+            command = [
+                sys.executable, "-m", "scripts.benchmark_cpu", *args.snippets, "--worker",
+                "--model", args.model, "--runs", str(args.runs), "--max-new-tokens", str(args.max_new_tokens),
+            ]
+            name = f"{quantization}{' + prompt cache' if prompt_cache == '1' else ''}"
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ {name} failed:\n{completed.stderr[-2000:]}")
+                continue
+            results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"⏱️ {name}: {results[name]}")
+
+    print("\nconfiguration             load (s)   tokens/s   p50 (s)   RSS (MB)   peak RSS (MB)")
+    for name, result in results.items():
+        print(
+            f"{name:<25} {result['load_seconds']:>8}   {result['tokens_per_second']:>8}   "
+            f"{result['latency_p50_seconds']:>7}   {result['rss_mb']:>8}   {result['peak_rss_mb']:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares fix model generation speed with and without speculative decoding.
+
+Run from the `server` directory:
+
+    python -m scripts.benchmark_decoding [snippet.py ...] [--lookahead 8] [--runs 3]
+
+Each snippet (a few built-in buggy samples by default) is fixed by the target
+model with plain greedy decoding, with the 1.7B adapter as draft model, and with
+prompt-lookup drafting. Greedy verification keeps the outputs identical, so the
+generated tokens/sec are directly comparable.
+"""
+import argparse
+import statistics
+import time
+
+from app.services.CodeFixer import build_fix_messages
+from app.services.InferenceScheduler import InferenceScheduler
+from app.services.ModelRegistry import DEFAULT_FIX_MODEL_ID, SMALL_FIX_MODEL_ID, model_registry
+
+SAMPLE_SNIPPETS = [
+    "def division(a, b)\n    return a / b\n\nprint(division(23, 0))\n",
+    "class Calculator:\n    def add(self, a, b):\n        return a - b\n\n    def multiply(self, a, b):\n        result = 0\n        for _ in range(b):\n            result += a\n        return result\n",
+    "def read_config(path):\n    with open(path) as f:\n        lines = f.readlines()\n    config = {}\n    for line in lines:\n        key, value = line.split('=')\n        config[key.strip()] = value.strip()\n    return confg\n",
+]
+
+
+def benchmark(scheduler: InferenceScheduler, model_id: str, snippets, runs: int, max_new_tokens: int) -> dict:
+    tokenizer = model_registry.get(model_id).llm.pipeline.tokenizer
+    seconds, tokens = [], []
+    for _ in range(runs):
+        for snippet in snippets:
+            started = time.perf_counter()
+            message = scheduler.generate(model_id, build_fix_messages(snippet), max_new_tokens=max_new_tokens)
+            seconds.append(time.perf_counter() - started)
+            tokens.append(len(tokenizer.encode(str(message.content), add_special_tokens=False)))
+    return {
+        "tokens_per_second": round(sum(tokens) / sum(seconds), 1),
+        "latency_p50_seconds": round(statistics.median(seconds), 2),
+        "avg_generated_tokens": round(sum(tokens) / len(tokens), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snippets", nargs="*", help="Python files to fix (default: built-in samples)")
+    parser.add_argument("--model", default=DEFAULT_FIX_MODEL_ID)
+    parser.add_argument("--draft-model", default=SMALL_FIX_MODEL_ID)
+    parser.add_argument("--lookahead", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-new-tokens", type=int, default=1000)
+    args = parser.parse_args()
+
+    snippets = SAMPLE_SNIPPETS
+    if args.snippets:
+        snippets = []
+        for path in args.snippets:
+            with open(path, encoding="utf-8") as f:
+                snippets.append(f.read())
+
+    # Load both models up front so load time is not measured
+    model_registry.preload([args.model, args.draft_model])
+
+    results = {}
+    for mode in ("off", "draft", "prompt_lookup"):
+        scheduler = InferenceScheduler(
+            max_batch_size=1,
+            max_wait_ms=0,
+            speculative_mode=mode,
+            speculative_lookahead=args.lookahead,
+            draft_model_id=args.draft_model,
+        )
+        # Warm-up run, not measured
+        scheduler.generate(args.model, build_fix_messages(snippets[0]), max_new_tokens=16)
+        results[mode] = benchmark(scheduler, args.model, snippets, args.runs, args.max_new_tokens)
+        print(f"⏱️ {mode}: {results[mode]}")
+
+    baseline = results["off"]["tokens_per_second"]
+    print("\nmode            tokens/s   p50 (s)   speedup")
+    for mode, result in results.items():
+        speedup = result["tokens_per_second"] / baseline if baseline else 0.0
+        print(f"{mode:<15} {result['tokens_per_second']:>8}   {result['latency_p50_seconds']:>7}   {speedup:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Merges a CodeMedic LoRA adapter into its base model and exports the result as
+safetensors, so workers load one memory-mapped checkpoint instead of loading the
+base model, downloading the adapter and applying it at startup.
+
+Run from the `server` directory:
+
+    python -m scripts.export_merged_model TheCasvi/Qwen3-4B-CodeMedic-adapter \
+        [--output-dir merged-models] [--base-model Qwen/Qwen3-4B] [--quantize none|int8|nf4]
+
+The export lands in `<output-dir>/<model id with "/" replaced by "__">`, which is
+where ModelRegistry looks for it when CODEMEDIC_MERGED_MODELS_DIR=<output-dir>.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import torch
+from peft import PeftConfig, PeftModel
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+
+from app.services.ModelRegistry import DEFAULT_FIX_MODEL_ID, EXPORT_MANIFEST, merged_model_dir
+
+QUANTIZATION_CONFIGS = {
+    "int8": lambda: BitsAndBytesConfig(load_in_8bit=True),
+    "nf4": lambda: BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4", bnb_4bit_compute_dtype=torch.bfloat16),
+}
+
+
+def merge_adapter(adapter_id: str, base_model_id: str):
+    """Loads `adapter_id` on top of `base_model_id` and folds the LoRA weights into the base weights."""
+    base_model = AutoModelForCausalLM.from_pretrained(base_model_id, torch_dtype=torch.bfloat16)
+    return PeftModel.from_pretrained(base_model, adapter_id).merge_and_unload()
+
+
+def export(adapter_id: str, output_dir: str, base_model_id: str = None, quantize: str = "none", max_shard_size: str = "2GB") -> str:
+    target_dir = merged_model_dir(output_dir, adapter_id)
+    base_model_id = base_model_id or PeftConfig.from_pretrained(adapter_id).base_model_name_or_path
+    print(f"⏳ Merging `{adapter_id}` into `{base_model_id}`...")
+    started = time.perf_counter()
+
+    merged_model = merge_adapter(adapter_id, base_model_id)
+    tokenizer = AutoTokenizer.from_pretrained(adapter_id)
+
+    # Write to a scratch directory first so a half-written export is never picked up
+    os.makedirs(output_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(dir=output_dir)
+    merged_model.save_pretrained(staging_dir, safe_serialization=True, max_shard_size=max_shard_size)
+    tokenizer.save_pretrained(staging_dir)
+
+    if quantize != "none":
+        # Quantize the merged weights (not the adapter), then re-save them pre-quantized
+        del merged_model
+        quantized_model = AutoModelForCausalLM.from_pretrained(staging_dir, quantization_config=QUANTIZATION_CONFIGS[quantize]())
+        quantized_dir = tempfile.mkdtemp(dir=output_dir)
+        quantized_model.save_pretrained(quantized_dir, safe_serialization=True, max_shard_size=max_shard_size)
+        tokenizer.save_pretrained(quantized_dir)
+        shutil.rmtree(staging_dir)
+        staging_dir = quantized_dir
+
+    with open(os.path.join(staging_dir, EXPORT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({
+            "adapter_id": adapter_id,
+            "base_model_id": base_model_id,
+            "quantization": quantize,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        }, f, indent=2)
+
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir)
+    os.replace(staging_dir, target_dir)
+    print(f"✅ Exported `{adapter_id}` to {target_dir} in {time.perf_counter() - started:.1f}s")
+    return target_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("adapter_ids", nargs="*", default=[DEFAULT_FIX_MODEL_ID])
+    parser.add_argument("--output-dir", default=os.getenv("CODEMEDIC_MERGED_MODELS_DIR", "merged-models"))
+    parser.add_argument("--base-model", help="Full-precision base to merge into (default: the adapter's base model)")
+    parser.add_argument("--quantize", choices=["none", *QUANTIZATION_CONFIGS], default="none")
+    parser.add_argument("--max-shard-size", default="2GB")
+    args = parser.parse_args()
+
+    for adapter_id in args.adapter_ids:
+        export(adapter_id, args.output_dir, args.base_model, args.quantize, args.max_shard_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+from app.models.models import CachedFix
+from app.services.FixCache import InMemoryFixCache, fix_cache_key, transfer_fix
+
+BUGGY = "def add(a, b):\n    return a - b\n"
+FIXED = "def add(a, b):\n    return a + b\n"
+
+
+def _cache():
+    return InMemoryFixCache(ttl_seconds=3600, max_entries=10)
+
+
+def test_exact_hit():
+    cache = _cache()
+    key = fix_cache_key(BUGGY, model_id="m")
+    cache.put(key, BUGGY, FIXED)
+    assert cache.get(key, BUGGY) == FIXED
+    assert cache.stats()["hits"] == 1
+
+
+def test_variant_shares_the_key_and_gets_the_fix_adapted():
+    variant = "# Adds two numbers\ndef add(a, b):\n\n    return a - b  \n"
+    assert fix_cache_key(variant, model_id="m") == fix_cache_key(BUGGY, model_id="m")
+    cache = _cache()
+    key = fix_cache_key(BUGGY, model_id="m")
+    cache.put(key, BUGGY, FIXED)
+    assert cache.get(key, variant) == "# Adds two numbers\ndef add(a, b):\n\n    return a + b\n"
+    assert cache.stats()["adapted_hits"] == 1
+
+
+def test_transfer_keeps_added_lines_in_place():
+    fixed = "def add(a, b):\n    a = int(a)\n    return a - b\n"
+    variant = "def add(a, b):\n    # sum\n    return a - b\n"
+    assert transfer_fix(BUGGY, fixed, variant) == "def add(a, b):\n    # sum\n    a = int(a)\n    return a - b\n"
+
+
+def test_transfer_is_rejected_when_the_changed_line_is_missing():
+    assert transfer_fix(BUGGY, FIXED, "def add(a, b):\n    return b - a\n") is None
+    cache = _cache()
+    key = fix_cache_key(BUGGY, model_id="m")
+    cache.put(key, BUGGY, FIXED)
+    assert cache.get(key, "def add(a, b):\n    return b - a\n") is None
+    assert cache.stats()["rejected"] == 1
+
+
+def test_fix_that_breaks_parsing_is_not_stored():
+    cache = _cache()
+    key = fix_cache_key(BUGGY, model_id="m")
+    cache.put(key, BUGGY, "def add(a, b:\n    return a + b\n")
+    assert cache.get(key, BUGGY) is None
+    assert cache.stats()["stores"] == 0
+
+
+def test_cached_fix_that_breaks_parsing_is_not_served():
+    cache = _cache()
+    key = fix_cache_key(BUGGY, model_id="m")
+    cache._store(key, CachedFix(original_code=BUGGY, fixed_code="def add(a, b:\n", created_at=datetime.now(timezone.utc)))
+    assert cache.get(key, BUGGY) is None
+    assert cache.stats()["rejected"] == 1
@@ -0,0 +1,51 @@
+import json
+
+from app.services.FixedCodeGrammar import DONE, START, STATES, advance, advance_text, closing_text
+
+
+def test_accepts_a_complete_document():
+    assert advance_text(START, '{"fixed_code":"x = 1\\n"}') == DONE
+
+
+def test_accepts_whitespace_between_tokens():
+    assert advance_text(START, ' {\n "fixed_code" : "x"\n}') == DONE
+
+
+def test_rejects_another_key():
+    assert advance_text(START, '{"code":') is None
+
+
+def test_rejects_whitespace_inside_the_key():
+    assert advance(("prefix", 3), " ") is None
+
+
+def test_escaped_quote_stays_in_the_string():
+    assert advance_text(START, '{"fixed_code":"say \\"hi\\"') == ("string", False)
+
+
+def test_rejects_an_invalid_escape():
+    assert advance_text(START, '{"fixed_code":"\\x') is None
+
+
+def test_accepts_raw_newlines_in_the_string():
+    assert advance_text(START, '{"fixed_code":"a\nb') == ("string", False)
+
+
+def test_nothing_follows_the_closed_object():
+    assert advance(DONE, "}") is None
+    assert advance(("tail", 0), "x") is None
+
+
+def test_closing_text_closes_every_state_into_parseable_json():
+    for state in STATES:
+        if state == DONE:
+            assert closing_text(state) == ""
+            continue
+        text = closing_text(state)
+        assert advance_text(state, text) == DONE
+
+
+def test_truncated_string_closes_into_parseable_json():
+    generated = '{"fixed_code":"def f():\\'
+    state = advance_text(START, generated)
+    assert json.loads(generated + closing_text(state)) == {"fixed_code": "def f():\\"}
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from app.models.models import RepositoryTree, RepositoryTreeEntry
+from app.services.SnapshotCache import snapshot_cache
+from app.services.tools.git_commit import commit_files, git_blob_sha
+
+
+class FakeRepo:
+    def __init__(self):
+        self.uploaded = []
+        self.trees = []
+
+    def get_git_ref(self, ref):
+        return SimpleNamespace(object=SimpleNamespace(sha="head"), edit=lambda sha, force: None)
+
+    def get_git_commit(self, sha):
+        return SimpleNamespace(sha=sha, tree="base-tree")
+
+    def create_git_blob(self, content, encoding):
+        self.uploaded.append(content)
+        return SimpleNamespace(sha=git_blob_sha(content.encode("utf-8")))
+
+    def create_git_tree(self, elements, base_tree):
+        self.trees.append(elements)
+        return "tree"
+
+    def create_git_commit(self, message, tree, parents):
+        return SimpleNamespace(sha="commit")
+
+
+def _tree(**files):
+    entries = [
+        RepositoryTreeEntry(path=path, type="blob", sha=git_blob_sha(content.encode("utf-8")), mode="100755")
+        for path, content in files.items()
+    ]
+    return RepositoryTree(repository="octocat/hello", commit_sha="head", entries=entries)
+
+
+def test_only_changed_files_are_uploaded(monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "get_tree", lambda repo, ref: _tree(**{"a.py": "a = 1\n", "b.py": "b = 1\n"}))
+    repo = FakeRepo()
+    commit = commit_files(repo, "fix", {"a.py": "a = 1\n", "b.py": "b = 2\n", "c.py": "c = 1\n"}, "Fix")
+    assert commit.sha == "commit"
+    assert repo.uploaded == ["b = 2\n", "c = 1\n"]
+    assert [(element._identity["path"], element._identity["mode"]) for element in repo.trees[0]] == [
+        ("b.py", "100755"),
+        ("c.py", "100644"),
+    ]
+
+
+def test_nothing_is_committed_when_no_file_changes(monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "get_tree", lambda repo, ref: _tree(**{"a.py": "a = 1\n"}))
+    repo = FakeRepo()
+    assert commit_files(repo, "fix", {"/a.py": "a = 1\n"}, "Fix") is None
+    assert repo.uploaded == []
@@ -0,0 +1,29 @@
+import threading
+
+from app.services.GitHubGateway import GitHubGateway, _GatewayAdapter, _GatewayConnection, github_gateway
+
+
+def test_builds_a_client_with_the_default_configuration():
+    client = github_gateway.client("ghp_test_default")
+    assert client is github_gateway.client("ghp_test_default")
+
+
+def test_builds_a_client_with_a_configured_timeout():
+    gateway = GitHubGateway(timeout_seconds=30)
+    assert gateway.client("ghp_test_timeout") is not None
+
+
+def test_client_connection_goes_through_the_gateway_adapter():
+    client = GitHubGateway().client("ghp_test_adapter")
+    connection = client.requester._Requester__createConnection()
+    assert isinstance(connection, _GatewayConnection)
+    assert isinstance(connection.session.get_adapter("https://api.github.com/"), _GatewayAdapter)
+
+
+def test_connection_keeps_pending_requests_per_thread():
+    connection = _GatewayConnection("api.github.com")
+    connection.request("GET", "/main", None, {})
+    thread = threading.Thread(target=connection.request, args=("POST", "/other", "{}", {}))
+    thread.start()
+    thread.join()
+    assert connection._pending.request == ("GET", "/main", None, {})
@@ -0,0 +1,61 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from app.services.JsonConstraint import FixedCodeLogitsProcessor
+
+# A character-level vocabulary plus a few multi-char tokens; id 0 is EOS
+_VOCAB = ["<eos>"] + list('{}":_ \\nabcdefiloprstx=1') + ['{"', '"}', "fixed", "_code", "ab"]
+
+
+class FakeTokenizer:
+    name_or_path = "fake-tokenizer"
+    all_special_ids = [0]
+
+    def __len__(self):
+        return len(_VOCAB)
+
+    def batch_decode(self, sequences):
+        return [_VOCAB[sequence[0]] for sequence in sequences]
+
+    def get_added_vocab(self):
+        return {}
+
+
+def _ids(*texts):
+    return [_VOCAB.index(text) for text in texts]
+
+
+def _allowed(processor, generated):
+    input_ids = torch.tensor([[0] + generated])
+    scores = processor(input_ids, torch.zeros(1, len(_VOCAB)))
+    return {_VOCAB[token_id] for token_id in range(len(_VOCAB)) if scores[0, token_id] != float("-inf")}
+
+
+def _processor(max_new_tokens=None):
+    processor = FixedCodeLogitsProcessor(FakeTokenizer(), [0], max_new_tokens)
+    # The first call fixes the prompt length: a one-token prompt
+    _allowed(processor, [])
+    return processor
+
+
+def test_only_the_opening_brace_starts_the_document():
+    assert _allowed(_processor(), []) == {"{", '{"', " "}
+
+
+def test_eos_only_once_the_object_is_closed():
+    processor = _processor()
+    inside = _ids("{", '"', "fixed", "_code", '"', ":", '"', "a")
+    assert "<eos>" not in _allowed(processor, inside)
+    assert _allowed(processor, inside + _ids('"}')) == {"<eos>"}
+
+
+def test_truncation_forces_the_closing_sequence():
+    processor = _processor(max_new_tokens=20)
+    generated = _ids("{", '"', "fixed", "_code", '"', ":", '"') + _ids(*"abcdefilopr")
+    assert "a" in _allowed(processor, generated[:-1])
+    assert processor.truncated_rows == 0
+    assert _allowed(processor, generated) == {'"'}
+    assert _allowed(processor, generated + _ids('"')) == {"}"}
+    assert processor.truncated_rows == 1
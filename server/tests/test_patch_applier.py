@@ -0,0 +1,13 @@
+from app.services.PatchApplier import apply_unified_diff
+
+
+def test_replaces_lines_at_stated_position():
+    assert apply_unified_diff("a\nb\nc\n", "@@ -2,1 +2,1 @@\n-b\n+B\n") == "a\nB\nc\n"
+
+
+def test_pure_insertion_goes_after_old_start():
+    assert apply_unified_diff("a\nb\nc\n", "@@ -2,0 +3,1 @@\n+X\n") == "a\nb\nX\nc\n"
+
+
+def test_pure_insertion_at_top_of_file():
+    assert apply_unified_diff("a\nb\n", "@@ -0,0 +1,1 @@\n+X\n") == "X\na\nb\n"
@@ -0,0 +1,23 @@
+import os
+import stat
+
+from app.services.SnapshotCache import SnapshotCache, ensure_private_dir
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_cache_directory_is_private(tmp_path):
+    cache = SnapshotCache(str(tmp_path / "snapshots"), memory_budget_bytes=0, disk_budget_bytes=1024 * 1024)
+    assert _mode(cache.cache_dir) == 0o700
+    cache._write_to_disk("blob:abc", b"secret")
+    assert _mode(os.path.dirname(cache._disk_path("blob:abc"))) & 0o077 == 0
+    assert _mode(cache._disk_path("blob:abc")) & 0o077 == 0
+
+
+def test_existing_directory_is_tightened(tmp_path):
+    path = tmp_path / "shared"
+    path.mkdir(mode=0o755)
+    ensure_private_dir(str(path))
+    assert _mode(path) == 0o700